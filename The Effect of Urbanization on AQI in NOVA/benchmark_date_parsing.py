@@ -0,0 +1,48 @@
+import os
+import time
+
+import pandas as pd
+
+from date_parsing import normalize_dates
+from fill_daily_data import DAILY_DATE_FORMATS, try_parse_date
+
+# Largest daily files - ISO dates for DC, and Howard/Loudoun for the m/d/Y mix
+BENCHMARK_FILES = [
+    "Washington, DC Data/cleaned_Air quality index in Washington, D.C..csv",
+    "Prince George's County, MD Data/cleaned_Air quality index in Prince George's County.csv",
+    "Loudoun County, VA Data/cleaned_Air quality index in Loudoun County.csv"
+]
+
+def time_call(func, repeat=3):
+    """Best wall time over a few runs, and the last result"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def benchmark_file(file_path):
+    dates = pd.read_csv(file_path, dtype={'Date': str})['Date']
+
+    row_time, row_result = time_call(lambda: pd.to_datetime(dates.apply(try_parse_date)), repeat=1)
+    bulk_time, (bulk_result, _, unparsed) = time_call(lambda: normalize_dates(dates, formats=DAILY_DATE_FORMATS))
+
+    # The bulk engine has to give exactly the same dates as the per-row parser
+    matches = row_result.reset_index(drop=True).equals(pd.Series(bulk_result))
+
+    print(f"{os.path.basename(file_path)}:")
+    print(f"  Rows: {len(dates)} ({unparsed} unparseable)")
+    print(f"  Per-row try_parse_date: {row_time:.3f}s")
+    print(f"  Bulk normalize_dates: {bulk_time:.4f}s")
+    print(f"  Speedup: {row_time / bulk_time:.0f}x")
+    print(f"  Results match: {matches}\n")
+
+def main():
+    base_dir = os.path.dirname(os.path.realpath(__file__))
+    for file in BENCHMARK_FILES:
+        benchmark_file(os.path.join(base_dir, file))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+
+import csv_cache
+from clean_aqi import clean_aqi_file
+from clean_temperature_data import process_temperature_data
+from fill_daily_data import fill_daily_file
+from interpolate_aqi import INTERPOLATION_LIMIT, load_and_prepare_aqi_data
+from panel import Panel
+from process_county_data import process_file
+from synthetic_data import write_synthetic_tree
+from yearly_aggregation import aggregate_to_yearly
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'benchmark_results')
+
+# A stage this much slower than the previous run is flagged as a regression
+REGRESSION_THRESHOLD = 1.2
+
+def files_matching(base_dir, pattern):
+    return sorted(glob.glob(os.path.join(base_dir, '*', pattern)))
+
+def run_clean(base_dir, streaming=False):
+    for path in files_matching(base_dir, 'Air quality index in *.csv'):
+        clean_aqi_file(path, streaming=streaming)
+
+def run_fill(base_dir):
+    for path in files_matching(base_dir, 'cleaned_*.csv'):
+        fill_daily_file(path)
+
+def run_interpolate(base_dir):
+    frames = [load_and_prepare_aqi_data(path) for path in files_matching(base_dir, 'cleaned_*.csv')]
+    panel = Panel.from_series({df['Location'].iloc[0]: df['AQI'] for df in frames})
+    panel.trim_to_common_range().interpolate(limit=INTERPOLATION_LIMIT)
+
+def run_yearly(base_dir):
+    for path in files_matching(base_dir, 'daily_cleaned_*.csv'):
+        aggregate_to_yearly(path)
+
+def run_process_files(base_dir):
+    for pattern in ('Air quality index in *.csv', 'Population in *.csv'):
+        for path in files_matching(base_dir, pattern):
+            process_file(path)
+
+def run_temperature(base_dir):
+    for path in files_matching(base_dir, 'Projected max temperature change*.csv'):
+        process_temperature_data(path, os.path.basename(os.path.dirname(path)))
+
+# (name, function, clear the csv cache before each run) in pipeline order - later stages read earlier outputs
+STAGES = [
+    ('clean_aqi (cold cache)', run_clean, True),
+    ('clean_aqi (warm cache)', run_clean, False),
+    ('clean_aqi (streaming)', lambda base_dir: run_clean(base_dir, streaming=True), False),
+    ('fill_daily_data', run_fill, False),
+    ('interpolate_aqi', run_interpolate, False),
+    ('yearly_aggregation', run_yearly, False),
+    ('process_county_data', run_process_files, False),
+    ('clean_temperature_data', run_temperature, False)
+]
+
+def measure(func, base_dir, clear_cache, repeat):
+    """Best wall time over repeat runs, then peak traced memory from one more run"""
+    best = None
+    for _ in range(repeat):
+        if clear_cache:
+            csv_cache.clear_cache()
+        start = time.perf_counter()
+        func(base_dir)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    if clear_cache:
+        csv_cache.clear_cache()
+    tracemalloc.start()
+    func(base_dir)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+def run_benchmarks(sizes, repeat=3, stage_filter=None):
+    results = []
+    default_cache_dir = csv_cache.CACHE_DIR
+    try:
+        for n_locations, n_years in sizes:
+            results.extend(run_size(n_locations, n_years, repeat, stage_filter))
+    finally:
+        csv_cache.CACHE_DIR = default_cache_dir
+    return results
+
+def run_size(n_locations, n_years, repeat, stage_filter):
+    """Generate one synthetic tree and time every stage on it"""
+    results = []
+    with tempfile.TemporaryDirectory() as base_dir:
+        write_synthetic_tree(base_dir, n_locations, n_years)
+        # Keep the benchmark's cache entries out of the real cache
+        csv_cache.CACHE_DIR = os.path.join(base_dir, '.csv_cache')
+        print(f"\n{n_locations} locations x {n_years} years:")
+
+        for name, func, clear_cache in STAGES:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                if stage_filter and not any(word in name for word in stage_filter):
+                    # Unselected stages still run once, untimed, to produce the next stage's inputs
+                    func(base_dir)
+                    continue
+                seconds, peak = measure(func, base_dir, clear_cache, repeat)
+            print(f"  {name:<28} {seconds:9.4f}s  peak {peak / 2**20:8.1f} MB")
+            results.append({
+                'stage': name,
+                'locations': n_locations,
+                'years': n_years,
+                'seconds': seconds,
+                'peak_mb': peak / 2**20
+            })
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.realpath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def latest_results(results_dir):
+    paths = sorted(glob.glob(os.path.join(results_dir, '*.json')))
+    if not paths:
+        return None
+    with open(paths[-1], 'r') as f:
+        return json.load(f)
+
+def compare(previous, results):
+    """Print stages that got slower than the previous run by more than REGRESSION_THRESHOLD"""
+    before = {(r['stage'], r['locations'], r['years']): r for r in previous['results']}
+    print(f"\nCompared with {previous['commit']} ({previous['timestamp']}):")
+    regressions = 0
+    for result in results:
+        old = before.get((result['stage'], result['locations'], result['years']))
+        if old is None:
+            continue
+        ratio = result['seconds'] / old['seconds'] if old['seconds'] > 0 else float('inf')
+        flag = "  REGRESSION" if ratio > REGRESSION_THRESHOLD else ""
+        print(f"  {result['stage']:<28} {result['locations']:>5} x {result['years']:<3} {ratio:6.2f}x{flag}")
+        regressions += bool(flag)
+    print(f"{regressions} regressions")
+
+def save_results(results, results_dir):
+    os.makedirs(results_dir, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'timestamp': timestamp,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results
+    }
+    output_path = os.path.join(results_dir, f"{timestamp}_{commit}.json")
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f"\nSaved benchmark results to {output_path}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Time every pipeline stage on synthetic Data Commons-shaped data")
+    parser.add_argument('--locations', type=int, nargs='+', default=[1, 10],
+                        help="numbers of locations to generate (1 to 1000)")
+    parser.add_argument('--years', type=int, nargs='+', default=[1, 10],
+                        help="years of daily data per location (1 to 50)")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per stage, best is kept")
+    parser.add_argument('--stage', nargs='+', help="only run stages whose name contains one of these words")
+    parser.add_argument('--results-dir', default=RESULTS_DIR, help="where JSON results are stored")
+    parser.add_argument('--no-save', action='store_true', help="don't write a results file")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    sizes = [(n_locations, n_years) for n_locations in args.locations for n_years in args.years]
+    previous = latest_results(args.results_dir)
+    results = run_benchmarks(sizes, repeat=args.repeat, stage_filter=args.stage)
+    if previous is not None:
+        compare(previous, results)
+    if not args.no_save:
+        save_results(results, args.results_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import argparse
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+import pandas as pd
+
+from clean_aqi import clean_aqi_file
+from fill_daily_data import fill_daily_file
+from instrumentation import add_report_arguments, run_report
+from yearly_aggregation import aggregate_to_yearly, combine_yearly_data
+
+MANIFEST_NAME = '.build_manifest.json'
+COMBINED_OUTPUT = 'combined_yearly_aqi.csv'
+
+# Prefixes the pipeline stages add to a raw AQI file name
+DERIVED_PREFIXES = ('cleaned_', 'daily_cleaned_', 'yearly_daily_cleaned_')
+
+def is_raw_aqi_file(file):
+    return (("Air quality index" in file or "AQI" in file) and file.endswith('.csv')
+            and not file.startswith(DERIVED_PREFIXES))
+
+# One input file -> one output file in the same folder, named from the input
+Stage = namedtuple('Stage', ['name', 'matches', 'output_name', 'run'])
+
+STAGES = [
+    Stage('clean_aqi', is_raw_aqi_file, lambda file: 'cleaned_' + file, clean_aqi_file),
+    Stage('fill_daily', lambda file: file.startswith('cleaned_') and file.endswith('.csv'),
+          lambda file: 'daily_' + file, fill_daily_file),
+    Stage('yearly', lambda file: file.startswith('daily_cleaned_') and file.endswith('.csv'),
+          lambda file: 'yearly_' + file, aggregate_to_yearly)
+]
+
+def find_files(base_dir, matches):
+    """All files under base_dir whose name matches, in sorted order"""
+    found = []
+    for root, dirs, files in os.walk(base_dir):
+        dirs.sort()
+        for file in sorted(files):
+            if matches(file):
+                found.append(os.path.join(root, file))
+    return found
+
+def load_manifest(manifest_path):
+    if not os.path.exists(manifest_path):
+        return {'outputs': {}}
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+def save_manifest(manifest, manifest_path):
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def file_signature(file_path, previous=None):
+    """
+    Content signature of a file. The sha1 is only recomputed when mtime or size
+    differ from the previous signature, so unchanged inputs cost one stat.
+    """
+    stat = os.stat(file_path)
+    if previous and previous['mtime_ns'] == stat.st_mtime_ns and previous['size'] == stat.st_size:
+        return previous
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(block)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha1': sha1.hexdigest()}
+
+class BuildGraph:
+    """Runs the stages, rebuilding only outputs whose recorded inputs changed"""
+
+    def __init__(self, base_dir, force=False, dry_run=False):
+        self.base_dir = base_dir
+        self.force = force
+        self.dry_run = dry_run
+        self.manifest_path = os.path.join(base_dir, MANIFEST_NAME)
+        self.manifest = load_manifest(self.manifest_path)
+        self.rebuilt = []
+        self.skipped = []
+
+    def relpath(self, path):
+        return os.path.relpath(path, self.base_dir)
+
+    def input_signatures(self, output_path, input_paths):
+        """Current signatures of the inputs, reusing hashes recorded for this output"""
+        record = self.manifest['outputs'].get(self.relpath(output_path), {})
+        recorded = record.get('inputs', {})
+        return {
+            self.relpath(path): file_signature(path, recorded.get(self.relpath(path)))
+            for path in input_paths
+        }
+
+    def is_stale(self, output_path, signatures):
+        if self.force or not os.path.exists(output_path):
+            return True
+        record = self.manifest['outputs'].get(self.relpath(output_path))
+        if record is None:
+            return True
+        recorded = record['inputs']
+        if set(recorded) != set(signatures):
+            return True
+        return any(recorded[path]['sha1'] != sig['sha1'] for path, sig in signatures.items())
+
+    def run_task(self, stage_name, output_path, input_paths, run):
+        signatures = self.input_signatures(output_path, input_paths)
+        if not self.is_stale(output_path, signatures):
+            self.skipped.append(output_path)
+            return
+
+        print(f"[{stage_name}] {self.relpath(output_path)} is out of date")
+        self.rebuilt.append(output_path)
+        if self.dry_run:
+            return
+        try:
+            run()
+        except Exception as e:
+            print(f"Error building {self.relpath(output_path)}: {str(e)}")
+            return
+        self.manifest['outputs'][self.relpath(output_path)] = {'stage': stage_name, 'inputs': signatures}
+
+    def run_stage(self, stage):
+        for input_path in find_files(self.base_dir, stage.matches):
+            root, file = os.path.split(input_path)
+            output_path = os.path.join(root, stage.output_name(file))
+            self.run_task(stage.name, output_path, [input_path], lambda: stage.run(input_path))
+
+    def run_combine(self):
+        """Many-to-one step: every county's yearly file -> combined_yearly_aqi.csv"""
+        yearly_files = find_files(self.base_dir, lambda file: file.startswith('yearly_daily_cleaned_') and file.endswith('.csv'))
+        if not yearly_files:
+            return
+        output_path = os.path.join(self.base_dir, COMBINED_OUTPUT)
+
+        def combine():
+            yearly_data = [pd.read_csv(path, dtype={'Date': str}) for path in yearly_files]
+            combine_yearly_data(yearly_data, output_path)
+
+        self.run_task('combine', output_path, yearly_files, combine)
+
+    def build(self):
+        for stage in STAGES:
+            self.run_stage(stage)
+        self.run_combine()
+        if not self.dry_run:
+            save_manifest(self.manifest, self.manifest_path)
+
+        action = "Would rebuild" if self.dry_run else "Rebuilt"
+        print(f"\n{action} {len(self.rebuilt)} outputs, {len(self.skipped)} up to date")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run clean -> fill daily -> yearly, rebuilding only stale outputs")
+    parser.add_argument('--force', action='store_true', help="rebuild every output")
+    parser.add_argument('--dry-run', action='store_true', help="list stale outputs without rebuilding them")
+    add_report_arguments(parser)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    base_dir = os.path.dirname(os.path.realpath(__file__))
+    with run_report(args.report, args.profile):
+        BuildGraph(base_dir, force=args.force, dry_run=args.dry_run).build()
+
+if __name__ == "__main__":
+    main()
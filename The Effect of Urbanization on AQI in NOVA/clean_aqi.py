@@ -1,60 +1,145 @@
+import argparse
 import csv
+import itertools
 import os
 
-def clean_aqi_file(input_file):
-    cleaned_data = []
-    # Add our header - we'll use Date for both daily and yearly data
-    cleaned_data.append(['Location', 'Date', 'AQI'])
-    
-    with open(input_file, 'r') as f:
-        # Create a CSV reader that handles quoted fields
-        reader = csv.reader(f)
-        header = next(reader)
-        
-        # Determine the file format based on header
-        if 'Year' in [h.strip() for h in header]:
-            # Yearly format
-            for row in reader:
-                try:
-                    # Handle both space-separated and non-space-separated formats
-                    row = [field.strip() for field in row]
-                    location = row[0]
-                    year = row[1]
-                    # Convert the AQI value, handling both integer and float formats
-                    aqi = float(row[2])
-                    # For yearly data, use the year as the date
-                    cleaned_data.append([location, str(year), aqi])
-                except (IndexError, ValueError):
-                    continue
-        else:
-            # Daily format
-            for row in reader:
-                try:
-                    if len(row) == 3:  # Simple format
-                        location, date, aqi = row
-                        aqi = float(aqi)
-                        cleaned_data.append([location, date, aqi])
-                    elif len(row) >= 11:  # Complex format
-                        location = row[2]
-                        date = row[4]
-                        aqi = float(row[10])
-                        cleaned_data.append([location, date, aqi])
-                except (IndexError, ValueError):
-                    continue
-    
+import numpy as np
+
+from csv_cache import DATA_COMMONS_COLUMNS, layout_for_header, load_observations, open_cached_columns
+from instrumentation import add_report_arguments, instrumented, record_rows, run_report
+
+# Rows read and written at a time in streaming mode
+CHUNK_SIZE = 10000
+
+def parse_yearly_row(row):
+    # Handle both space-separated and non-space-separated formats
+    row = [field.strip() for field in row]
+    # For yearly data, use the year as the date
+    return [row[0], str(row[1]), float(row[2])]
+
+def parse_simple_row(row):
+    location, date, aqi = row
+    return [location, date, float(aqi)]
+
+def parse_complex_row(row):
+    return [row[2], row[4], float(row[10])]
+
+def select_row_parser(header, first_row):
+    """
+    Pick the row format once instead of re-checking every row. The header decides
+    yearly vs daily; the width of the first data row decides the daily format, since
+    some exports carry a 3-column header over 12-column rows.
+    """
+    if 'Year' in [h.strip() for h in header]:
+        return parse_yearly_row
+    width = len(first_row) if first_row is not None else len(header)
+    if width == 3:  # Simple format
+        return parse_simple_row
+    if width >= 11:  # Complex format
+        return parse_complex_row
+    return None
+
+def csv_chunks(reader, parse_row, chunk_size):
+    """Yield (cleaned_rows, rejected_count) for successive chunks of CSV rows (all rows at once if chunk_size is None)"""
+    while True:
+        rows = list(itertools.islice(reader, chunk_size))
+        if not rows:
+            return
+        cleaned = []
+        for row in rows:
+            try:
+                cleaned.append(parse_row(row))
+            except (IndexError, ValueError):
+                continue
+        yield cleaned, len(rows) - len(cleaned)
+
+def cached_chunks(columns, meta, chunk_size):
+    """Yield (cleaned_rows, rejected_count) from memory-mapped cache columns, chunk_size rows at a time"""
+    categories = np.array(meta['location_categories'], dtype=object)
+    total = len(columns['value'])
+    for start in range(0, total, chunk_size):
+        stop = min(start + chunk_size, total)
+        values = np.asarray(columns['value'][start:stop])
+        # Rows without a numeric AQI are skipped, same as the CSV path
+        keep = ~np.isnan(values)
+        locations = categories[columns['location_codes'][start:stop][keep]]
+        dates = columns['date_text'][start:stop][keep]
+        cleaned = list(zip(locations.tolist(), dates.tolist(), values[keep].tolist()))
+        yield cleaned, int((~keep).sum())
+
+@instrumented('clean_aqi')
+def clean_aqi_file(input_file, streaming=False, chunk_size=CHUNK_SIZE):
+    """
+    Clean an AQI file into cleaned_<file> with Location, Date, AQI columns.
+    Rows are written as they are cleaned. With streaming=True memory stays bounded by
+    chunk_size: Data Commons exports are read from the binary cache only if it is
+    already fresh (building it would load the whole file), otherwise row by row.
+    """
     # Generate output filename
     dirname = os.path.dirname(input_file)
     basename = "cleaned_" + os.path.basename(input_file)
     output_file = os.path.join(dirname, basename)
     
-    # Write cleaned data
-    with open(output_file, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerows(cleaned_data)
+    records = 0
+    rejected = 0
+    with open(input_file, 'r', newline='') as f_in, open(output_file, 'w', newline='', buffering=1 << 20) as f_out:
+        # Create a CSV reader that handles quoted fields
+        reader = csv.reader(f_in)
+        header = next(reader)
+        writer = csv.writer(f_out)
+        # Add our header - we'll use Date for both daily and yearly data
+        writer.writerow(['Location', 'Date', 'AQI'])
+        
+        chunks = None
+        if layout_for_header(header) == DATA_COMMONS_COLUMNS:
+            # Data Commons export - load typed columns from the binary cache
+            if streaming:
+                cached = open_cached_columns(input_file, layout=DATA_COMMONS_COLUMNS, with_text=True)
+                if cached is not None:
+                    chunks = cached_chunks(*cached, chunk_size)
+            else:
+                observations = load_observations(input_file, layout=DATA_COMMONS_COLUMNS, with_text=True)
+                if observations is not None:
+                    kept = observations.dropna(subset=['Value'])
+                    cleaned = list(zip(
+                        kept['Location'].astype(str).tolist(),
+                        kept['DateText'].tolist(),
+                        kept['Value'].tolist()
+                    ))
+                    chunks = [(cleaned, len(observations) - len(kept))]
+        
+        if chunks is None:
+            # Determine the file format based on header and first row
+            first_row = next(reader, None)
+            if first_row is not None:
+                reader = itertools.chain([first_row], reader)
+            parse_row = select_row_parser(header, first_row)
+            if parse_row is None:
+                print(f"Unrecognized AQI layout in {input_file}, no rows cleaned")
+                chunks = []
+            else:
+                chunks = csv_chunks(reader, parse_row, chunk_size if streaming else None)
+        
+        # Write cleaned data
+        for cleaned, chunk_rejected in chunks:
+            writer.writerows(cleaned)
+            records += len(cleaned)
+            rejected += chunk_rejected
     
-    print(f"Cleaned data saved to {output_file} with {len(cleaned_data)-1} records")
+    record_rows(records + rejected, records)
+    print(f"Cleaned data saved to {output_file} with {records} records ({rejected} rejected)")
+    return output_file
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Clean raw AQI files into Location, Date, AQI")
+    parser.add_argument('--streaming', action='store_true',
+                        help="read and write rows in chunks so memory stays bounded on large files")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help=f"rows per chunk in streaming mode (default: {CHUNK_SIZE})")
+    add_report_arguments(parser)
+    return parser.parse_args()
 
-def main():
+def main(streaming=False, chunk_size=CHUNK_SIZE):
     base_dir = os.path.dirname(os.path.realpath(__file__))
     
     # Process each county's AQI file
@@ -64,7 +149,9 @@ def main():
                 if not file.startswith('cleaned_'):  # Skip already cleaned files
                     input_file = os.path.join(root, file)
                     print(f"Processing {file}...")
-                    clean_aqi_file(input_file)
+                    clean_aqi_file(input_file, streaming=streaming, chunk_size=chunk_size)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    with run_report(args.report, args.profile):
+        main(streaming=args.streaming, chunk_size=args.chunk_size)
@@ -1,21 +1,41 @@
+import argparse
+import contextlib
+import os
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
-def process_temperature_data(input_file, county_name):
-    # Read the CSV file
-    df = pd.read_csv(input_file)
-    
-    try:
-        # First try YYYY-MM format
-        df['date'] = pd.to_datetime(df['Variable observation date'], format='%Y-%m')
-    except:
-        try:
-            # Try YYYY format
-            df['date'] = pd.to_datetime(df['Variable observation date'], format='%Y')
-        except:
-            # Try extracting year from the date string
-            df['date'] = pd.to_datetime(df['Variable observation date'].str[:4], format='%Y')
+from csv_cache import DATA_COMMONS_COLUMNS, load_observations
+from date_parsing import detect_date_format
+from file_catalog import FileCatalog
+from run_config import DEFAULT_CONFIG, add_config_arguments, config_from_args
+
+# Rows looked at to decide the date format of a file
+DATE_SAMPLE_SIZE = 100
+
+def process_temperature_data(input_file, county_name, config=DEFAULT_CONFIG):
+    # Data Commons exports come back from the binary cache with dates already parsed
+    cached = load_observations(input_file, layout=DATA_COMMONS_COLUMNS)
+    if cached is not None:
+        df = pd.DataFrame({
+            'date': cached['Date'],
+            'Variable observation value': cached['Value']
+        })
+    else:
+        # Read the CSV file
+        df = pd.read_csv(input_file)
+        dates = df['Variable observation date'].astype(str)
+        
+        # Monthly (YYYY-MM) or yearly (YYYY), decided from the first rows
+        date_format = detect_date_format(dates.head(DATE_SAMPLE_SIZE), formats=['%Y-%m', '%Y'])
+        if date_format is not None:
+            df['date'] = pd.to_datetime(dates, format=date_format, errors='coerce')
+        else:
+            df['date'] = pd.NaT
+        # Anything else falls back to the year at the start of the date string
+        unparsed = df['date'].isna()
+        df.loc[unparsed, 'date'] = pd.to_datetime(dates[unparsed].str[:4], format='%Y', errors='coerce')
     
     # Extract year
     df['year'] = df['date'].dt.year
@@ -23,8 +43,8 @@ def process_temperature_data(input_file, county_name):
     # Calculate yearly averages
     yearly_avg = df.groupby('year')['Variable observation value'].mean().reset_index()
     
-    # Create full range of years from 2000 to 2023
-    full_range = pd.DataFrame({'year': range(2000, 2024)})
+    # Create full range of years in the window
+    full_range = pd.DataFrame({'year': config.years})
     
     # Merge with actual data
     merged = pd.merge(full_range, yearly_avg, on='year', how='left')
@@ -41,47 +61,65 @@ def process_temperature_data(input_file, county_name):
     
     return final_df
 
-def find_temperature_file(county_folder, county_name):
+def find_temperature_file(county_folder, county_name, catalog=None):
     base_patterns = [
         f"{county_folder}/Projected max temperature change under RCP 2.6 (based on year 2006) in {county_name.split(',')[0]}.csv",
         f"{county_folder}/{county_name.split(',')[0]} Yearly Temp Change 2000-2024.csv",
         f"{county_folder}/temperature_data.csv"
     ]
     
+    # Known names cost one stat each; the file itself is only read once it's processed
     for pattern in base_patterns:
-        try:
-            pd.read_csv(pattern)
+        if os.path.isfile(pattern):
             return pattern
-        except:
-            continue
+    
+    # Otherwise any raw temperature file the catalog found in the folder
+    if catalog is None:
+        catalog = FileCatalog.load(os.getcwd())
+    input_file = catalog.find(county_folder, 'Temperature')
+    if input_file is not None:
+        return os.path.relpath(input_file, catalog.base_dir)
     
     raise FileNotFoundError(f"Could not find temperature file for {county_name}")
 
-# Process Frederick County data
-frederick_input = "Fredrick County, MD Data/Projected max temperature change under RCP 2.6 (based on year 2006) in Frederick County.csv"
-frederick_output = "Fredrick County, MD Data/frederick_yearly_temp_2000_2023.csv"
-
-frederick_df = process_temperature_data(frederick_input, "Frederick County, MD")
-frederick_df.to_csv(frederick_output, index=False)
-print("Processed Frederick County, MD")
-
-# Process all other counties
-counties = [
-    ("Howard County, MD Data", "Howard County, MD"),
-    ("Montgomery County, MD Data", "Montgomery County, MD"),
-    ("Prince George's County, MD Data", "Prince George's County, MD"),
-    ("Loudoun County, VA Data", "Loudoun County, VA"),
-    ("Prince William County, VA Data", "Prince William County, VA"),
-    ("Washington, DC Data", "Washington, DC")
-]
-
-for county_folder, county_name in counties:
+def process_county(county_folder, county_name, config=DEFAULT_CONFIG):
+    """
+    Find, process and save one county's temperature data
+    Returns the line to print, so counties processed in worker processes report in order
+    """
     try:
         input_file = find_temperature_file(county_folder, county_name)
-        output_file = f"{county_folder}/{county_name.split(',')[0].lower().replace(' ', '_')}_yearly_temp_2000_2023.csv"
+        output_file = f"{county_folder}/{county_name.split(',')[0].lower().replace(' ', '_')}_yearly_temp_{config.window}.csv"
         
-        county_df = process_temperature_data(input_file, county_name)
+        county_df = process_temperature_data(input_file, county_name, config)
         county_df.to_csv(output_file, index=False)
-        print(f"Processed {county_name}")
+        return f"Processed {county_name}"
     except Exception as e:
-        print(f"Error processing {county_name}: {str(e)}")
\ No newline at end of file
+        return f"Error processing {county_name}: {str(e)}"
+
+def main(workers=None, config=DEFAULT_CONFIG):
+    # (folder, county, config) for each of the run's regions
+    counties = [(region.folder, region.label, config) for region in config.regions]
+    if not counties:
+        return
+    
+    # Counties are independent, so by default each gets its own process
+    if workers is None:
+        workers = min(len(counties), os.cpu_count() or 1)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else contextlib.nullcontext()
+    with pool as executor:
+        # Results come back in submission order, so the log reads the same for any worker count
+        mapper = executor.map if executor is not None else map
+        for message in mapper(process_county, *zip(*counties)):
+            print(message)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Average each county's projected temperature change per year over the study window")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="number of worker processes (default: one per county, up to the CPU count)")
+    add_config_arguments(parser)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    main(workers=args.workers, config=config_from_args(args))
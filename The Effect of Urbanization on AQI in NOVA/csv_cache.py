@@ -0,0 +1,168 @@
+import csv
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from date_parsing import normalize_dates
+
+# Column layouts we know how to cache, as (location, date, value) header names
+DATA_COMMONS_COLUMNS = ('Entity properties name', 'Variable observation date', 'Variable observation value')
+CLEANED_COLUMNS = ('Location', 'Date', 'AQI')
+LAYOUTS = [DATA_COMMONS_COLUMNS, CLEANED_COLUMNS]
+
+# Bump when the on-disk column format changes so old entries are ignored
+CACHE_VERSION = 1
+# Default cache location, read at call time so it can be redirected (e.g. by the benchmarks)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), '.csv_cache')
+
+def layout_for_header(header):
+    """Return the known (location, date, value) layout contained in a CSV header, if any"""
+    for layout in LAYOUTS:
+        if all(col in header for col in layout):
+            return layout
+    return None
+
+def sniff_layout(file_path):
+    """Read only the header line of a CSV and match it against the known layouts"""
+    with open(file_path, 'r', newline='') as f:
+        header = next(csv.reader(f), [])
+    return layout_for_header(header)
+
+def cache_entry_dir(file_path, cache_dir=None):
+    """Cache directory for the current version of a file, keyed by path + mtime + size"""
+    real_path = os.path.realpath(file_path)
+    stat = os.stat(real_path)
+    cache_dir = cache_dir or CACHE_DIR
+    path_key = hashlib.sha1(real_path.encode('utf-8')).hexdigest()
+    stamp_key = hashlib.sha1(f"{CACHE_VERSION}|{stat.st_mtime_ns}|{stat.st_size}".encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, path_key, stamp_key)
+
+def _build_columns(file_path, layout):
+    """Parse the CSV once and turn the layout columns into typed arrays"""
+    location_col, date_col, value_col = layout
+    df = pd.read_csv(
+        file_path,
+        usecols=list(layout),
+        dtype={location_col: str, date_col: str},
+        keep_default_na=False
+    )
+
+    location_codes, location_categories = pd.factorize(df[location_col])
+    date_text = df[date_col].to_numpy(dtype=str)
+    dates, date_format, _ = normalize_dates(df[date_col])
+    values = pd.to_numeric(df[value_col], errors='coerce').to_numpy(dtype=np.float64)
+
+    columns = {
+        'location_codes': location_codes.astype(np.int32),
+        'date': dates,
+        'date_format': date_format,
+        'date_text': date_text,
+        'value': values
+    }
+    meta = {
+        'version': CACHE_VERSION,
+        'source': os.path.realpath(file_path),
+        'layout': list(layout),
+        'location_categories': [str(c) for c in location_categories],
+        'rows': len(df)
+    }
+    return columns, meta
+
+def _write_entry(entry_dir, columns, meta):
+    """Write column files to a temp dir and rename it into place so readers never see partial entries"""
+    parent_dir = os.path.dirname(entry_dir)
+    os.makedirs(parent_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=parent_dir)
+    try:
+        for name, values in columns.items():
+            np.save(os.path.join(tmp_dir, name + '.npy'), values)
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+        # Drop entries for older versions of the same file
+        for old_entry in os.listdir(parent_dir):
+            old_path = os.path.join(parent_dir, old_entry)
+            if old_path != tmp_dir and not old_entry.startswith('.tmp-'):
+                shutil.rmtree(old_path, ignore_errors=True)
+        os.rename(tmp_dir, entry_dir)
+    except OSError:
+        # Another process may have written the same entry first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def _read_entry(entry_dir, with_text):
+    """Memory-map the column files of a cache entry, or return None on a miss"""
+    meta_path = os.path.join(entry_dir, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, 'r') as f:
+        meta = json.load(f)
+    if meta.get('version') != CACHE_VERSION:
+        return None
+
+    names = ['location_codes', 'date', 'date_format', 'value']
+    if with_text:
+        names.append('date_text')
+    columns = {name: np.load(os.path.join(entry_dir, name + '.npy'), mmap_mode='r') for name in names}
+    return columns, meta
+
+def _to_frame(columns, meta, with_text):
+    frame = pd.DataFrame({
+        'Location': pd.Categorical.from_codes(columns['location_codes'], categories=meta['location_categories']),
+        'Date': columns['date'],
+        'DateFormat': columns['date_format'],
+        'Value': columns['value']
+    })
+    if with_text:
+        frame['DateText'] = columns['date_text'].astype(object)
+    return frame
+
+def open_cached_columns(file_path, layout=None, with_text=False, cache_dir=None):
+    """
+    Memory-map the raw column arrays of a fresh cache entry without building a DataFrame.
+    Returns (columns, meta), or None if there is no fresh entry for this layout - a miss
+    never parses the CSV, so callers that need bounded memory can fall back to streaming it.
+    """
+    entry = _read_entry(cache_entry_dir(file_path, cache_dir), with_text)
+    if entry is None:
+        return None
+    columns, meta = entry
+    if layout is not None and tuple(meta['layout']) != tuple(layout):
+        return None
+    return columns, meta
+
+def load_observations(file_path, layout=None, with_text=False, cache_dir=None):
+    """
+    Load the location/date/value columns of an observation CSV as typed columns.
+    Returns a DataFrame with Location (categorical), Date (datetime64), DateFormat
+    (index into date_parsing.DATE_FORMATS, -1 if unparsed), Value (float64) and optionally the
+    original DateText, or None if the file is not one of the known layouts.
+    A fresh cache entry is memory-mapped; on a miss the CSV is parsed and cached.
+    """
+    cached = open_cached_columns(file_path, layout, with_text, cache_dir)
+    if cached is not None:
+        return _to_frame(*cached, with_text)
+
+    file_layout = sniff_layout(file_path)
+    if file_layout is None or (layout is not None and file_layout != tuple(layout)):
+        return None
+
+    try:
+        columns, meta = _build_columns(file_path, file_layout)
+    except (pd.errors.ParserError, UnicodeDecodeError):
+        # Leave files pandas can't tokenize to the caller's CSV path
+        return None
+
+    try:
+        _write_entry(cache_entry_dir(file_path, cache_dir), columns, meta)
+    except OSError as e:
+        print(f"Could not cache {file_path}: {str(e)}")
+    return _to_frame(columns, meta, with_text)
+
+def clear_cache(cache_dir=None):
+    """Remove every cached entry"""
+    shutil.rmtree(cache_dir or CACHE_DIR, ignore_errors=True)
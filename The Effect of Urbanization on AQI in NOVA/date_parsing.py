@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+# Date formats in the order they are tried, with the shape of string each one accepts.
+# The shapes don't overlap, so classifying by shape gives the same answer as trying
+# the formats one after another.
+DATE_FORMATS = ['%Y-%m-%d', '%Y', '%m/%d/%Y', '%Y/%m/%d', '%Y-%m']
+DATE_PATTERNS = {
+    '%Y-%m-%d': r'\d{4}-\d{1,2}-\d{1,2}',  # 2000-01-01
+    '%Y': r'\d{4}',                         # 2000
+    '%m/%d/%Y': r'\d{1,2}/\d{1,2}/\d{4}',   # 1/1/2000
+    '%Y/%m/%d': r'\d{4}/\d{1,2}/\d{1,2}',   # 2000/01/01
+    '%Y-%m': r'\d{4}-\d{1,2}'               # 2000-01
+}
+YEAR_FORMAT = DATE_FORMATS.index('%Y')
+
+def detect_date_format(sample, formats=DATE_FORMATS):
+    """First format whose shape matches every non-empty value in sample, or None"""
+    sample = pd.Series(sample, dtype=object).dropna().astype(str).str.strip()
+    sample = sample[sample != '']
+    if sample.empty:
+        return None
+    for fmt in formats:
+        pattern = DATE_PATTERNS.get(fmt)
+        if pattern is not None and sample.str.fullmatch(pattern).all():
+            return fmt
+    return None
+
+def normalize_dates(date_text, formats=DATE_FORMATS):
+    """
+    Parse a column of mixed-format date strings in bulk.
+    Rows are grouped by the format their shape matches and each group is parsed with
+    one to_datetime call. Rows that match no shape (or fail their format) are retried
+    against every format in order, so the result matches trying formats row by row.
+    Returns (dates, format_codes, unparsed) where dates is datetime64[ns] with NaT for
+    failures, format_codes indexes into formats (-1 if unparsed) and unparsed is the
+    count of rows that could not be parsed.
+    """
+    date_text = pd.Series(date_text, dtype=object).reset_index(drop=True).astype(str)
+    dates = np.full(len(date_text), np.datetime64('NaT'), dtype='datetime64[ns]')
+    format_codes = np.full(len(date_text), -1, dtype=np.int8)
+
+    def parse_group(rows, code):
+        parsed = pd.to_datetime(date_text.iloc[rows], format=formats[code], errors='coerce')
+        hit = parsed.notna().to_numpy()
+        dates[rows[hit]] = parsed.to_numpy(dtype='datetime64[ns]')[hit]
+        format_codes[rows[hit]] = code
+
+    # Detect the format mix by shape and parse each group in one call
+    for code, fmt in enumerate(formats):
+        pattern = DATE_PATTERNS.get(fmt)
+        rows = np.flatnonzero(format_codes == -1)
+        if pattern is None or len(rows) == 0:
+            continue
+        matches = date_text.iloc[rows].str.fullmatch(pattern).to_numpy(dtype=bool)
+        if matches.any():
+            parse_group(rows[matches], code)
+
+    # Anything left over gets every format tried in order
+    for code in range(len(formats)):
+        rows = np.flatnonzero(format_codes == -1)
+        if len(rows) == 0:
+            break
+        parse_group(rows, code)
+
+    unparsed = int((format_codes == -1).sum())
+    return dates, format_codes, unparsed
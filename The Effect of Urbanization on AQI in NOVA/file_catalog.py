@@ -0,0 +1,205 @@
+import csv
+import json
+import os
+
+from csv_cache import DATA_COMMONS_COLUMNS
+
+CATALOG_NAME = '.file_catalog.json'
+CATALOG_VERSION = 2
+
+# Keywords identifying a measure, checked in order against the Variable DCID, then the
+# value column's name, then the file name. Employment comes before Population because
+# the employment DCID is Count_Person_Employed.
+MEASURE_KEYWORDS = [
+    ('AQI', ('airqualityindex', 'air quality', 'air_quality', 'aqi')),
+    ('PM2.5', ('pm2.5',)),
+    ('Income', ('income',)),
+    ('Employment', ('employ',)),
+    ('Population', ('population', 'count_person')),
+    ('Temperature', ('temperature', 'temp'))
+]
+
+# Prefixes the AQI stages add to a file name, longest first
+STAGE_PREFIXES = [
+    ('yearly_daily_cleaned_', 'yearly'),
+    ('daily_cleaned_', 'daily'),
+    ('cleaned_', 'cleaned')
+]
+
+def measure_for(*texts):
+    """First measure whose keywords appear in any of texts, tried in order. 'Value' if none do"""
+    for text in texts:
+        if not text:
+            continue
+        text = text.lower()
+        for measure, keywords in MEASURE_KEYWORDS:
+            if any(keyword in text for keyword in keywords):
+                return measure
+    return 'Value'
+
+def stage_for(filename):
+    for prefix, stage in STAGE_PREFIXES:
+        if filename.startswith(prefix):
+            return stage
+    # Raw exports keep their descriptive titles; files the scripts write are snake_case
+    return 'raw' if ' ' in filename else 'output'
+
+def location_for(folder):
+    """Catalog location key of a county folder, e.g. 'Howard County, MD Data' -> 'Howard County, MD'"""
+    name = os.path.basename(os.path.normpath(folder))
+    return name[:-len(' Data')] if name.endswith(' Data') else name
+
+def sniff_file(file_path):
+    """
+    Describe a CSV from its header and first data row only: layout, columns,
+    entity name and DCID, Variable DCID, unit and the measure it holds
+    """
+    with open(file_path, 'r', newline='', encoding='utf-8', errors='replace') as f:
+        reader = csv.reader(f)
+        header = [column.strip() for column in next(reader, [])]
+        first_row = [value.strip() for value in next(reader, [])]
+    fields = dict(zip(header, first_row))
+
+    if 'Variable DCID' in header:
+        layout = 'data_commons'
+    elif tuple(header) == DATA_COMMONS_COLUMNS:
+        layout = 'data_commons_simple'
+    else:
+        layout = 'table'
+
+    variable_dcid = fields.get('Variable DCID')
+    # The value is the last column in every layout the counties use
+    value_column = header[-1] if header else None
+    if layout == 'data_commons':
+        value_column = 'Variable observation value'
+    filename = os.path.basename(file_path)
+    return {
+        'layout': layout,
+        'columns': header,
+        'entity_name': fields.get('Entity properties name', fields.get('Location')),
+        'entity_dcid': fields.get('Entity DCID'),
+        'variable_dcid': variable_dcid,
+        'unit': fields.get('Variable observation metadata unit') or None,
+        'first_date': fields.get('Variable observation date', fields.get('Date', fields.get('Year'))),
+        'measure': measure_for(variable_dcid, value_column if layout == 'table' else None, filename),
+        'stage': stage_for(filename)
+    }
+
+class FileCatalog:
+    """
+    Index of every CSV in the county folders by location x measure x stage, built from
+    file headers and persisted next to the data. Refreshing re-sniffs only files whose
+    mtime or size changed.
+    """
+
+    def __init__(self, base_dir, entries=None):
+        self.base_dir = base_dir
+        self.path = os.path.join(base_dir, CATALOG_NAME)
+        self.entries = entries if entries is not None else {}
+        self._build_index()
+
+    @classmethod
+    def load(cls, base_dir, refresh=True):
+        """Load the saved catalog, refreshing and re-saving it if anything changed"""
+        entries = {}
+        path = os.path.join(base_dir, CATALOG_NAME)
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                saved = json.load(f)
+            if saved.get('version') == CATALOG_VERSION:
+                entries = saved['entries']
+        catalog = cls(base_dir, entries)
+        if refresh and catalog.refresh():
+            catalog.save()
+        return catalog
+
+    def _build_index(self):
+        self.index = {}
+        for relpath in sorted(self.entries):
+            entry = self.entries[relpath]
+            key = (entry['location'], entry['measure'], entry['stage'])
+            self.index.setdefault(key, []).append(relpath)
+
+    def refresh(self):
+        """Re-sniff new and changed files and drop deleted ones. Returns the number of changes"""
+        seen = set()
+        changes = 0
+        folders = sorted(os.listdir(self.base_dir)) if os.path.isdir(self.base_dir) else []
+        for folder in folders:
+            folder_path = os.path.join(self.base_dir, folder)
+            if not folder.endswith(' Data') or not os.path.isdir(folder_path):
+                continue
+            for root, dirs, files in os.walk(folder_path):
+                dirs.sort()
+                for file in sorted(files):
+                    if not file.endswith('.csv'):
+                        continue
+                    file_path = os.path.join(root, file)
+                    relpath = os.path.relpath(file_path, self.base_dir)
+                    seen.add(relpath)
+                    stat = os.stat(file_path)
+                    entry = self.entries.get(relpath)
+                    if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                        continue
+                    try:
+                        entry = sniff_file(file_path)
+                    except (OSError, csv.Error) as e:
+                        print(f"Could not read header of {relpath}: {str(e)}")
+                        continue
+                    entry.update(location=location_for(folder), mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                    self.entries[relpath] = entry
+                    changes += 1
+
+        for relpath in set(self.entries) - seen:
+            del self.entries[relpath]
+            changes += 1
+        if changes:
+            self._build_index()
+        return changes
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': CATALOG_VERSION, 'entries': self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def find_all(self, location, measure, stage='raw'):
+        """Absolute paths of every file for location x measure x stage, in sorted order"""
+        relpaths = self.index.get((location_for(location), measure, stage), [])
+        return [os.path.join(self.base_dir, relpath) for relpath in relpaths]
+
+    def find(self, location, measure, stage='raw'):
+        """First file for location x measure x stage, or None"""
+        paths = self.find_all(location, measure, stage)
+        return paths[0] if paths else None
+
+    def entry(self, file_path):
+        return self.entries.get(os.path.relpath(file_path, self.base_dir))
+
+    def files_in(self, location):
+        """(absolute path, entry) for every file in one location's folder, in sorted order"""
+        location = location_for(location)
+        return [
+            (os.path.join(self.base_dir, relpath), self.entries[relpath])
+            for relpath in sorted(self.entries)
+            if self.entries[relpath]['location'] == location
+        ]
+
+    def locations(self):
+        return sorted({entry['location'] for entry in self.entries.values()})
+
+    def measures(self, location):
+        return sorted({entry['measure'] for _, entry in self.files_in(location)})
+
+def main():
+    base_dir = os.path.dirname(os.path.realpath(__file__))
+    catalog = FileCatalog.load(base_dir)
+    for location in catalog.locations():
+        print(f"\n{location}:")
+        for file_path, entry in catalog.files_in(location):
+            source = entry['variable_dcid'] or entry['layout']
+            print(f"  {entry['measure']:<12} {entry['stage']:<8} {os.path.basename(file_path)} ({source})")
+    print(f"\n{len(catalog.entries)} files in {len(catalog.locations())} locations, catalog saved to {catalog.path}")
+
+if __name__ == "__main__":
+    main()
@@ -3,61 +3,86 @@ import numpy as np
 from pathlib import Path
 import os
 
+from csv_cache import CLEANED_COLUMNS, load_observations
+from date_parsing import YEAR_FORMAT, normalize_dates
+from instrumentation import instrumented, record_rows
+from run_config import START_YEAR
+
+# Formats accepted for daily AQI dates, in the order they are tried
+DAILY_DATE_FORMATS = [
+    '%Y-%m-%d',  # 2000-01-01
+    '%Y',        # 2000
+    '%m/%d/%Y',  # 1/1/2000
+    '%Y/%m/%d'   # 2000/01/01
+]
+
 def try_parse_date(date_str):
-    """Try different date formats"""
-    formats = [
-        '%Y-%m-%d',  # 2000-01-01
-        '%Y',        # 2000
-        '%m/%d/%Y',  # 1/1/2000
-        '%Y/%m/%d'   # 2000/01/01
-    ]
-    
-    for fmt in formats:
+    """Try different date formats on a single value (see normalize_dates for whole columns)"""
+    for fmt in DAILY_DATE_FORMATS:
         try:
             return pd.to_datetime(date_str, format=fmt)
         except:
             continue
     return None
 
+def expand_yearly_to_daily(df, value_column='AQI'):
+    """
+    Expand one row per year (Date at the start of the year) to one row per day of that year.
+    The daily dates are built in one vectorized pass and Location/value are repeated with
+    np.repeat, so no per-day Python objects are created.
+    """
+    year_starts = df['Date'].to_numpy(dtype='datetime64[ns]').astype('datetime64[Y]')
+    first_days = year_starts.astype('datetime64[D]')
+    days_in_year = ((year_starts + 1).astype('datetime64[D]') - first_days).astype(np.int64)
+    
+    # Row i of the input becomes days_in_year[i] consecutive rows of the output
+    rows = np.repeat(np.arange(len(df)), days_in_year)
+    day_offsets = np.arange(len(rows)) - np.repeat(np.cumsum(days_in_year) - days_in_year, days_in_year)
+    
+    return pd.DataFrame({
+        'Date': (first_days[rows] + day_offsets).astype('datetime64[ns]'),
+        'Location': df['Location'].to_numpy()[rows],
+        value_column: df[value_column].to_numpy()[rows]
+    })
+
 def fill_daily_data(df):
     """Fill in missing days with interpolated values"""
+    # Typed frames from csv_cache already carry parsed dates and their source format
+    typed = 'DateFormat' in df.columns
+    
     # Check if this is yearly data (4-digit year) or daily data (full date)
-    first_date = str(df['Date'].iloc[0])
+    if typed:
+        is_yearly = df['DateFormat'].iloc[0] == YEAR_FORMAT
+    else:
+        first_date = str(df['Date'].iloc[0])
+        is_yearly = len(first_date) <= 4
     
     # Convert Date to datetime based on format
-    if len(first_date) <= 4:  # Yearly format
+    if is_yearly:  # Yearly format
         # Convert year to start of year date
-        df['Date'] = pd.to_datetime(df['Date'].astype(str) + '-01-01')
-        # Create daily entries for each year
-        dates = []
-        locations = []
-        values = []
-        for _, row in df.iterrows():
-            year = row['Date'].year
-            # Skip years before 2000
-            if year < 2000:
-                continue
-            daily_dates = pd.date_range(start=f'{year}-01-01', end=f'{year}-12-31', freq='D')
-            dates.extend(daily_dates)
-            locations.extend([row['Location']] * len(daily_dates))
-            values.extend([row['AQI']] * len(daily_dates))
-        df = pd.DataFrame({
-            'Date': dates,
-            'Location': locations,
-            'AQI': values
-        })
+        if not typed:
+            df['Date'] = pd.to_datetime(df['Date'].astype(str) + '-01-01')
+        # Skip years before the study window, then create daily entries for each year
+        df = df[df['Date'].dt.year >= START_YEAR]
+        df = expand_yearly_to_daily(df)
     else:  # Daily format
-        # Try parsing each date individually to handle mixed formats
-        df['Date'] = df['Date'].apply(try_parse_date)
+        # Parse the mixed-format dates in bulk, one to_datetime call per format
+        if typed:
+            unparsed = int((df['DateFormat'] == -1).sum())
+        else:
+            dates, _, unparsed = normalize_dates(df['Date'], formats=DAILY_DATE_FORMATS)
+            df['Date'] = dates
+        if unparsed:
+            print(f"Dropping {unparsed} rows with unparseable dates")
         
         # Drop any rows where date parsing failed
         df = df.dropna(subset=['Date'])
         
-        # Filter for years 2000 and later
-        df = df[df['Date'].dt.year >= 2000]
+        # Filter for years in the study window and later
+        df = df[df['Date'].dt.year >= START_YEAR]
         
         # Handle duplicate dates by taking the mean AQI value for each date
-        df = df.groupby(['Date', 'Location'], as_index=False)['AQI'].mean()
+        df = df.groupby(['Date', 'Location'], as_index=False, observed=True)['AQI'].mean()
     
     # Set Date as index
     df = df.set_index('Date')
@@ -84,6 +109,43 @@ def fill_daily_data(df):
     
     return df
 
+@instrumented('fill_daily_data')
+def fill_daily_file(file_path):
+    """Fill one cleaned AQI file to daily resolution and save it as daily_<file>"""
+    root, file = os.path.split(file_path)
+    
+    # Read the cleaned file, from the binary cache when it's fresh
+    df = load_observations(file_path, layout=CLEANED_COLUMNS)
+    if df is not None:
+        df = df.rename(columns={'Value': 'AQI'})
+    else:
+        df = pd.read_csv(file_path)
+    
+    # Fill in missing days
+    df_filled = fill_daily_data(df)
+    record_rows(len(df), len(df_filled))
+    
+    # Create output filename
+    output_filename = 'daily_' + file
+    output_path = os.path.join(root, output_filename)
+    
+    # Save the filled data
+    df_filled.to_csv(output_path, index=False)
+    
+    # Print statistics
+    total_days = len(df_filled)
+    missing_values = df_filled['AQI'].isna().sum()
+    date_range = pd.date_range(df_filled['Date'].min(), df_filled['Date'].max())
+    expected_days = len(date_range)
+    
+    print(f"Saved filled daily data to {output_filename}")
+    print(f"Total days: {total_days}")
+    print(f"Expected days: {expected_days}")
+    print(f"Missing values: {missing_values}")
+    print(f"Data completeness: {(total_days-missing_values)/expected_days*100:.1f}%\n")
+    
+    return output_path
+
 def process_files():
     # Get the base directory
     base_dir = Path(__file__).parent
@@ -96,31 +158,7 @@ def process_files():
                 print(f"Processing {file}...")
                 
                 try:
-                    # Read the CSV file
-                    df = pd.read_csv(file_path)
-                    
-                    # Fill in missing days
-                    df_filled = fill_daily_data(df)
-                    
-                    # Create output filename
-                    output_filename = 'daily_' + file
-                    output_path = os.path.join(root, output_filename)
-                    
-                    # Save the filled data
-                    df_filled.to_csv(output_path, index=False)
-                    
-                    # Print statistics
-                    total_days = len(df_filled)
-                    missing_values = df_filled['AQI'].isna().sum()
-                    date_range = pd.date_range(df_filled['Date'].min(), df_filled['Date'].max())
-                    expected_days = len(date_range)
-                    
-                    print(f"Saved filled daily data to {output_filename}")
-                    print(f"Total days: {total_days}")
-                    print(f"Expected days: {expected_days}")
-                    print(f"Missing values: {missing_values}")
-                    print(f"Data completeness: {(total_days-missing_values)/expected_days*100:.1f}%\n")
-                    
+                    fill_daily_file(file_path)
                 except Exception as e:
                     print(f"Error processing {file}: {str(e)}\n")
 
@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import hashlib
+import http.client
+import json
+import os
+import queue
+from collections import namedtuple
+from urllib.parse import quote, urlsplit
+
+from csv_cache import DATA_COMMONS_COLUMNS, load_observations
+from file_catalog import FileCatalog, location_for
+from run_config import DEFAULT_CONFIG, add_config_arguments, config_from_args
+
+MANIFEST_NAME = '.ingest_manifest.json'
+# Where the observation exports are mirrored; a plain static file server works
+BASE_URL = os.environ.get('DATA_COMMONS_MIRROR', 'http://localhost:8000')
+# Export path of one entity x variable under the base URL, e.g. /geoId/24027/Count_Person.csv
+URL_TEMPLATE = '{base_url}/{entity}/{variable}.csv'
+MAX_CONNECTIONS = 8
+TIMEOUT = 30
+
+IngestJob = namedtuple('IngestJob', ['entity_dcid', 'variable_dcid', 'file_path'])
+
+def export_url(job, base_url=BASE_URL):
+    return URL_TEMPLATE.format(
+        base_url=base_url.rstrip('/'),
+        entity=quote(job.entity_dcid, safe='/'),
+        variable=quote(job.variable_dcid, safe='')
+    )
+
+def jobs_from_catalog(catalog, regions=None):
+    """
+    One job per raw Data Commons export in the catalog that names its Variable DCID,
+    refreshed in place. The entity comes from the file, or from the region registry
+    if the header has no Entity DCID.
+    """
+    dcids = {location_for(region.folder): region.dcid for region in regions or []}
+    jobs = []
+    for relpath, entry in sorted(catalog.entries.items()):
+        if entry['layout'] != 'data_commons' or entry['stage'] != 'raw' or not entry['variable_dcid']:
+            continue
+        if regions is not None and entry['location'] not in dcids:
+            continue
+        entity_dcid = entry.get('entity_dcid') or dcids.get(entry['location'])
+        if entity_dcid is None:
+            continue
+        jobs.append(IngestJob(entity_dcid, entry['variable_dcid'], os.path.join(catalog.base_dir, relpath)))
+    return jobs
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP connections shared by concurrent fetches, at most max_connections
+    open at once. Requests run in worker threads so the event loop never blocks.
+    """
+
+    def __init__(self, max_connections=MAX_CONNECTIONS, timeout=TIMEOUT):
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(max_connections)
+        self._idle = {}
+
+    def _connection(self, scheme, netloc):
+        try:
+            return self._idle.setdefault((scheme, netloc), queue.LifoQueue()).get_nowait()
+        except queue.Empty:
+            connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            return connection_class(netloc, timeout=self.timeout)
+
+    def _request(self, url, headers):
+        parts = urlsplit(url)
+        path = parts.path + (f'?{parts.query}' if parts.query else '')
+        connection = self._connection(parts.scheme, parts.netloc)
+        try:
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed an idle keep-alive connection; retry once on a fresh one
+                connection.close()
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+            body = response.read()
+        except Exception:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            self._idle[(parts.scheme, parts.netloc)].put(connection)
+        return response.status, dict(response.getheaders()), body
+
+    async def get(self, url, headers=None):
+        """(status, headers, body) of a GET request"""
+        async with self._slots:
+            return await asyncio.to_thread(self._request, url, headers or {})
+
+    def close(self):
+        for idle in self._idle.values():
+            while not idle.empty():
+                idle.get_nowait().close()
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_manifest(manifest, path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def file_sha1(file_path):
+    with open(file_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def write_export(file_path, body):
+    """Atomically replace the CSV, then parse it once into the column cache"""
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(body)
+    os.replace(tmp_path, file_path)
+    return load_observations(file_path, layout=DATA_COMMONS_COLUMNS)
+
+async def fetch_job(job, pool, manifest, base_dir, base_url=BASE_URL):
+    """
+    Conditionally fetch one export. Returns 'not modified' if the server says so,
+    'unchanged' if it sent identical bytes, 'updated' if the file was rewritten,
+    or an error message. The manifest entry is updated in place.
+    """
+    url = export_url(job, base_url)
+    relpath = os.path.relpath(job.file_path, base_dir)
+    state = manifest.get(relpath, {})
+    headers = {'Accept': 'text/csv'}
+    # Validators only count if they belong to the file as it is on disk
+    if state.get('url') == url and os.path.exists(job.file_path):
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+
+    try:
+        status, response_headers, body = await pool.get(url, headers)
+    except (OSError, http.client.HTTPException) as e:
+        return f"failed: {str(e)}"
+    if status == 304:
+        return 'not modified'
+    if status != 200:
+        return f"failed: HTTP {status}"
+
+    digest = hashlib.sha1(body).hexdigest()
+    result = 'unchanged'
+    # Files downloaded by hand have no manifest entry yet, so compare against the bytes on disk
+    if not os.path.exists(job.file_path) or (state.get('sha1') or file_sha1(job.file_path)) != digest:
+        observations = await asyncio.to_thread(write_export, job.file_path, body)
+        if observations is None:
+            return "failed: response is not a Data Commons export"
+        result = 'updated'
+    manifest[relpath] = {
+        'url': url,
+        'etag': response_headers.get('ETag'),
+        'last_modified': response_headers.get('Last-Modified'),
+        'sha1': digest
+    }
+    return result
+
+async def ingest(jobs, base_dir, base_url=BASE_URL, max_connections=MAX_CONNECTIONS, manifest_path=None):
+    """Fetch every job concurrently and save the manifest. Returns {job: result} in job order"""
+    manifest_path = manifest_path or os.path.join(base_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    pool = ConnectionPool(max_connections)
+    try:
+        results = await asyncio.gather(*(fetch_job(job, pool, manifest, base_dir, base_url) for job in jobs))
+    finally:
+        pool.close()
+    save_manifest(manifest, manifest_path)
+    return dict(zip(jobs, results))
+
+def main(base_url=BASE_URL, max_connections=MAX_CONNECTIONS, config=DEFAULT_CONFIG):
+    base_dir = os.path.dirname(os.path.realpath(__file__))
+    jobs = jobs_from_catalog(FileCatalog.load(base_dir), config.regions)
+    print(f"Fetching {len(jobs)} exports from {base_url} over up to {max_connections} connections")
+    results = asyncio.run(ingest(jobs, base_dir, base_url, max_connections))
+
+    counts = {}
+    for job, result in results.items():
+        print(f"  {job.entity_dcid} {job.variable_dcid}: {result}")
+        outcome = result.split(':')[0]
+        counts[outcome] = counts.get(outcome, 0) + 1
+    print("\n" + ", ".join(f"{count} {result}" for result, count in sorted(counts.items())))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Refresh the Data Commons exports in the county folders from a mirror")
+    parser.add_argument('--base-url', default=BASE_URL,
+                        help=f"mirror serving <entity>/<variable>.csv exports (default: {BASE_URL})")
+    parser.add_argument('--max-connections', type=int, default=MAX_CONNECTIONS,
+                        help=f"concurrent connections (default: {MAX_CONNECTIONS})")
+    add_config_arguments(parser)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    main(args.base_url, args.max_connections, config_from_args(args))
@@ -0,0 +1,231 @@
+import contextlib
+import cProfile
+import csv
+import functools
+import json
+import os
+import pstats
+import sys
+import time
+
+# Per-file fields in the order they are written to CSV reports
+RECORD_FIELDS = ['stage', 'file', 'wall_seconds', 'cpu_seconds', 'rows_in', 'rows_out',
+                 'input_bytes', 'bytes_read', 'peak_rss_mb', 'error']
+
+# The report being collected, if any. Instrumented functions cost one check when it's None
+_active_report = None
+# Record of the measurement currently running, so the measured code can add row counts
+_current_record = None
+
+def _proc_io_rchar():
+    """Bytes this process has read through read() calls so far, None off Linux"""
+    try:
+        with open('/proc/self/io', 'r') as f:
+            for line in f:
+                if line.startswith('rchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _reset_peak_rss():
+    """Reset the kernel's high-water RSS mark so the next reading covers one measurement only"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_mb():
+    """Peak resident set size in MB, since the last reset where supported"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        # No rusage on Windows
+        return None
+    # ru_maxrss is the lifetime peak, in KB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+class RunReport:
+    """Per-file measurements from one run, summarized per stage and saved as JSON or CSV"""
+
+    def __init__(self):
+        self.records = []
+        self.started = time.time()
+
+    def add(self, record):
+        self.records.append(record)
+
+    def extend(self, records):
+        self.records.extend(records)
+
+    def stage_summary(self):
+        """Totals per stage in first-seen order; peak RSS is the largest of any file"""
+        stages = {}
+        for record in self.records:
+            summary = stages.setdefault(record['stage'], {
+                'stage': record['stage'], 'files': 0, 'errors': 0, 'wall_seconds': 0.0,
+                'cpu_seconds': 0.0, 'rows_in': 0, 'rows_out': 0, 'bytes_read': 0, 'peak_rss_mb': 0.0
+            })
+            summary['files'] += 1
+            summary['errors'] += record['error'] is not None
+            summary['wall_seconds'] += record['wall_seconds']
+            summary['cpu_seconds'] += record['cpu_seconds']
+            for field in ('rows_in', 'rows_out', 'bytes_read'):
+                summary[field] += record[field] or 0
+            summary['peak_rss_mb'] = max(summary['peak_rss_mb'], record['peak_rss_mb'] or 0.0)
+        return list(stages.values())
+
+    def save(self, path):
+        """Write the report: .csv gets one row per file, anything else JSON with stages and files"""
+        if path.endswith('.csv'):
+            with open(path, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=RECORD_FIELDS)
+                writer.writeheader()
+                writer.writerows(self.records)
+        else:
+            with open(path, 'w') as f:
+                json.dump({
+                    'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+                    'argv': sys.argv,
+                    'stages': self.stage_summary(),
+                    'files': self.records
+                }, f, indent=1)
+        print(f"Saved run report to {path}")
+
+    def print_summary(self, slowest=5):
+        print("\nRun report:")
+        print(f"  {'stage':<20} {'files':>5} {'wall s':>9} {'cpu s':>9} {'rows in':>10} {'rows out':>10} {'peak MB':>8}")
+        for summary in self.stage_summary():
+            print(f"  {summary['stage']:<20} {summary['files']:>5} {summary['wall_seconds']:>9.3f} "
+                  f"{summary['cpu_seconds']:>9.3f} {summary['rows_in']:>10} {summary['rows_out']:>10} "
+                  f"{summary['peak_rss_mb']:>8.1f}")
+        # The files that dominate the runtime
+        if self.records:
+            print("  Slowest files:")
+            for record in sorted(self.records, key=lambda r: r['wall_seconds'], reverse=True)[:slowest]:
+                print(f"    {record['wall_seconds']:8.3f}s  {record['stage']}  {record['file'] or ''}")
+
+def active_report():
+    return _active_report
+
+@contextlib.contextmanager
+def measure(stage, file=None):
+    """
+    Time one unit of work (usually one file) and add it to the active report.
+    Does nothing when no report is being collected. Nested measurements are
+    recorded, but share the outer measurement's peak RSS window.
+    """
+    global _current_record
+    if _active_report is None:
+        yield None
+        return
+
+    outer = _current_record
+    record = dict.fromkeys(RECORD_FIELDS)
+    record['stage'] = stage
+    record['file'] = file
+    if file is not None and os.path.isfile(file):
+        record['input_bytes'] = os.path.getsize(file)
+    if outer is None:
+        _reset_peak_rss()
+    rchar = _proc_io_rchar()
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    _current_record = record
+    try:
+        yield record
+    except Exception as e:
+        record['error'] = str(e)
+        raise
+    finally:
+        _current_record = outer
+        record['wall_seconds'] = time.perf_counter() - wall
+        record['cpu_seconds'] = time.process_time() - cpu
+        if rchar is not None:
+            record['bytes_read'] = _proc_io_rchar() - rchar
+        record['peak_rss_mb'] = _peak_rss_mb()
+        _active_report.add(record)
+
+def record_rows(rows_in=None, rows_out=None):
+    """Attach row counts to the measurement in progress, if there is one"""
+    if _current_record is None:
+        return
+    if rows_in is not None:
+        _current_record['rows_in'] = int(rows_in)
+    if rows_out is not None:
+        _current_record['rows_out'] = int(rows_out)
+
+def record_error(error):
+    """Mark the measurement in progress as failed, for code that handles its own exceptions"""
+    if _current_record is not None:
+        _current_record['error'] = str(error)
+
+def instrumented(stage):
+    """Decorator measuring each call of a function whose first argument is the file it works on"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(file_path, *args, **kwargs):
+            if _active_report is None:
+                return func(file_path, *args, **kwargs)
+            with measure(stage, str(file_path)):
+                return func(file_path, *args, **kwargs)
+        return wrapper
+    return decorator
+
+@contextlib.contextmanager
+def collect():
+    """Collect records into a fresh report, e.g. in a worker process. Yields the report"""
+    global _active_report
+    previous = _active_report
+    report = RunReport()
+    _active_report = report
+    try:
+        yield report
+    finally:
+        _active_report = previous
+
+@contextlib.contextmanager
+def run_report(path=None, profile=None):
+    """
+    Collect a report for the whole run, print the per-stage summary and save it to
+    path if given. With profile set, the run is also profiled with cProfile and the
+    stats are written there (open them with pstats or snakeviz) and the top
+    functions by cumulative time are printed.
+    """
+    if path is None and profile is None:
+        yield None
+        return
+
+    profiler = cProfile.Profile() if profile else None
+    with collect() as report:
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield report
+        finally:
+            if profiler is not None:
+                profiler.disable()
+
+    report.print_summary()
+    if path is not None:
+        report.save(path)
+    if profiler is not None:
+        profiler.dump_stats(profile)
+        print(f"Saved profile to {profile}")
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+
+def add_report_arguments(parser):
+    parser.add_argument('--report', metavar='PATH',
+                        help="write per-file timing and memory to PATH (.json or .csv)")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="profile the run with cProfile and save the stats to PATH")
@@ -1,8 +1,21 @@
+import argparse
+
 import pandas as pd
 import numpy as np
 from pathlib import Path
 import os
 
+from fill_daily_data import expand_yearly_to_daily
+from instrumentation import add_report_arguments, measure, record_rows, run_report
+from interpolation import interpolate_gaps
+from panel import Panel
+
+# Saved dates x counties panel, next to interpolated_aqi_data.csv
+PANEL_DIR = 'interpolated_aqi_panel'
+
+# Longest gap, in days, that gets interpolated
+INTERPOLATION_LIMIT = 7
+
 def load_and_prepare_aqi_data(file_path):
     # Read the CSV file
     df = pd.read_csv(file_path)
@@ -13,20 +26,10 @@ def load_and_prepare_aqi_data(file_path):
     if len(str(first_date)) <= 4:  # Yearly format (YYYY)
         # Convert year to daily dates
         df['Date'] = pd.to_datetime(df['Date'].astype(str) + '-01-01')
-        df = df.set_index('Date')
         
-        # Create daily entries for each year
-        new_data = []
-        for year in df.index.year.unique():
-            year_data = df[df.index.year == year]
-            dates = pd.date_range(start=f'{year}-01-01', end=f'{year}-12-31', freq='D')
-            for date in dates:
-                new_data.append({
-                    'Date': date,
-                    'Location': year_data['Location'].iloc[0],
-                    'AQI': year_data['AQI'].iloc[0]
-                })
-        df = pd.DataFrame(new_data)
+        # Create daily entries for each year, using the first row seen for each year
+        df = df[~df['Date'].dt.year.duplicated()]
+        df = expand_yearly_to_daily(df)
         df.set_index('Date', inplace=True)
     else:
         # Handle daily format
@@ -42,8 +45,8 @@ def interpolate_county_data(df):
     # For daily data, interpolate gaps
     df_daily = df.copy()
     
-    # Use linear interpolation for gaps up to 7 days
-    df_daily['AQI'] = df_daily['AQI'].interpolate(method='linear', limit=7)
+    # Use linear interpolation for gaps up to 7 days, same kernel as the full panel
+    df_daily['AQI'], _ = interpolate_gaps(df_daily['AQI'].to_numpy(dtype=np.float64, copy=True), limit=INTERPOLATION_LIMIT)
     
     return df_daily
 
@@ -77,48 +80,44 @@ def main():
         print("No valid data files were processed")
         return
     
-    # Find the common date range
-    start_dates = []
-    end_dates = []
-    for df in county_data.values():
-        start_dates.append(df.index.min())
-        end_dates.append(df.index.max())
-    
-    common_start = max(start_dates)
-    common_end = min(end_dates)
+    # Put every county on one dates x counties array
+    panel = Panel.from_series({county: df['AQI'] for county, df in county_data.items()})
     
+    # Find the common date range and trim all counties to it at once
+    common_start, common_end = panel.common_range()
     print(f"\nCommon date range: {common_start.date()} to {common_end.date()}")
+    panel = panel.trim_to_common_range()
     
-    # Interpolate data for each county within the common date range
-    interpolated_data = {}
-    for county, df in county_data.items():
-        # Filter to common date range
-        df_filtered = df[common_start:common_end]
-        
-        # Interpolate
-        df_interpolated = interpolate_county_data(df_filtered)
-        
-        # Store interpolated data
-        interpolated_data[county] = df_interpolated
+    # Interpolate gaps of up to 7 days in every county at once; longer gaps stay missing
+    with measure('interpolate_aqi'):
+        missing_before = np.isnan(panel.values).sum()
+        panel, gap_histogram = panel.interpolate(limit=INTERPOLATION_LIMIT)
+        record_rows(panel.values.size - missing_before, panel.values.size - panel.missing_counts().sum())
     
-    # Create a combined dataframe with all counties
-    combined_df = pd.DataFrame()
-    for county, df in interpolated_data.items():
-        combined_df[county] = df['AQI']
-    
-    # Save interpolated data
+    # Save interpolated data, plus the panel itself so later stages can skip the CSV
     output_path = base_dir / 'interpolated_aqi_data.csv'
-    combined_df.to_csv(output_path)
+    panel.to_frame().to_csv(output_path)
+    panel.save(base_dir / PANEL_DIR)
     print(f"\nInterpolated data saved to {output_path}")
     
     # Print statistics
     print("\nInterpolation statistics:")
-    for county in combined_df.columns:
-        missing = combined_df[county].isna().sum()
-        total = len(combined_df)
+    total = len(panel.dates)
+    gap_lengths = np.arange(len(gap_histogram))
+    for column, (county, missing) in enumerate(zip(panel.locations, panel.missing_counts())):
+        gaps = gap_histogram[:, column]
+        filled_gaps = gaps[1:INTERPOLATION_LIMIT + 1].sum()
         print(f"{county}:")
         print(f"  Total days: {total}")
+        print(f"  Gaps: {gaps.sum()} ({filled_gaps} filled, longest {gap_lengths[gaps > 0].max(initial=0)} days)")
         print(f"  Missing values after interpolation: {missing} ({missing/total*100:.1f}%)")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Interpolate every county's daily AQI over their common date range")
+    add_report_arguments(parser)
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    with run_report(args.report, args.profile):
+        main()
\ No newline at end of file
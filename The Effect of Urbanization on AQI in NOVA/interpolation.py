@@ -0,0 +1,59 @@
+import numpy as np
+
+def find_gaps(values):
+    """
+    Locate every run of NaNs down the columns of a 2-D array.
+    Returns (columns, starts, lengths) with one entry per gap, ordered by column then row.
+    """
+    missing = np.isnan(values)
+    # Pad each column with a non-missing row on both ends so every run has a start and an end
+    padded = np.zeros((values.shape[1], values.shape[0] + 2), dtype=np.int8)
+    padded[:, 1:-1] = missing.T
+    edges = np.diff(padded, axis=1)
+    columns, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return columns, starts, ends - starts
+
+def gap_histogram(columns, lengths, n_columns):
+    """Count of gaps by length for each column, as a (max_length + 1) x n_columns array"""
+    max_length = int(lengths.max()) if len(lengths) else 0
+    histogram = np.zeros((max_length + 1, n_columns), dtype=np.int64)
+    np.add.at(histogram, (lengths, columns), 1)
+    return histogram
+
+def interpolate_gaps(values, limit=None, copy=False):
+    """
+    Linearly interpolate interior NaN gaps of at most limit rows in every column of a
+    2-D float array at once. Longer gaps, and gaps touching the first or last row, are
+    left as NaN. Works in place unless copy=True.
+    Returns (values, histogram) where histogram[length, column] counts every gap
+    (filled or not) of that length before filling.
+    """
+    if values.ndim == 1:
+        filled, histogram = interpolate_gaps(values[:, np.newaxis], limit, copy)
+        return filled[:, 0], histogram
+    if copy:
+        values = values.copy()
+
+    n_rows, n_columns = values.shape
+    columns, starts, lengths = find_gaps(values)
+    histogram = gap_histogram(columns, lengths, n_columns)
+
+    # Only interior gaps have a value on both sides to interpolate between
+    fill = (starts > 0) & (starts + lengths < n_rows)
+    if limit is not None:
+        fill &= lengths <= limit
+    columns, starts, lengths = columns[fill], starts[fill], lengths[fill]
+    if len(lengths) == 0:
+        return values, histogram
+
+    before = values[starts - 1, columns]
+    after = values[starts + lengths, columns]
+
+    # One output cell per missing row: step k of a gap of length n gets k / (n + 1) of the way across
+    gap = np.repeat(np.arange(len(lengths)), lengths)
+    step = np.arange(len(gap)) - np.repeat(np.cumsum(lengths) - lengths, lengths) + 1
+    fraction = step / (lengths[gap] + 1)
+    values[starts[gap] + step - 1, columns[gap]] = before[gap] + (after[gap] - before[gap]) * fraction
+
+    return values, histogram
@@ -0,0 +1,160 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from file_catalog import FileCatalog, location_for
+from process_county_data import read_observations
+from run_config import DEFAULT_CONFIG, END_YEAR, START_YEAR, add_config_arguments, config_from_args
+
+STORE_NAME = 'measures.npz'
+
+def categorical_arrays(column):
+    """(codes, categories) of a categorical column, ready for np.savez"""
+    return column.cat.codes.to_numpy(), column.cat.categories.to_numpy(dtype=str)
+
+def from_categorical_arrays(codes, categories):
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+def fill_years(wide):
+    """
+    Fill a (location, measure) x year matrix the way process_file does per file:
+    linear interpolation between observed years, then the nearest observed year
+    carried out to both ends
+    """
+    filled = wide.interpolate(method='linear', axis=1, limit_area='inside')
+    return filled.ffill(axis=1).bfill(axis=1)
+
+class MeasureStore:
+    """
+    Every county's observations of every measure in one long table
+    (Location, Measure, Date, Year, Value) with categorical Location and Measure.
+    Yearly means, gap filling and the wide regression view are computed for all
+    locations and measures at once.
+    """
+
+    def __init__(self, observations):
+        self.observations = observations
+        self._yearly = {}
+
+    @classmethod
+    def from_catalog(cls, catalog, regions=None):
+        """
+        Read the raw file for each location x measure in the catalog once, for the given
+        regions only if any. Where a folder has several raw files of one measure, the
+        first in sorted order is used.
+        """
+        locations = catalog.locations()
+        if regions is not None:
+            wanted = {location_for(region.folder) for region in regions}
+            locations = [location for location in locations if location in wanted]
+        
+        frames = []
+        for location in locations:
+            for measure in catalog.measures(location):
+                if measure == 'Value':
+                    continue
+                file_path = catalog.find(location, measure)
+                if file_path is None:
+                    continue
+                try:
+                    df = read_observations(file_path, measure)
+                except Exception as e:
+                    print(f"Error reading {file_path}: {str(e)}")
+                    continue
+                if df is None:
+                    continue
+                df.insert(0, 'Location', location)
+                df.insert(1, 'Measure', measure)
+                frames.append(df)
+
+        observations = pd.concat(frames, ignore_index=True)
+        observations['Location'] = observations['Location'].astype('category')
+        observations['Measure'] = observations['Measure'].astype('category')
+        observations['Year'] = observations['Year'].astype(np.int16)
+        observations['Value'] = pd.to_numeric(observations['Value'], errors='coerce')
+        return cls(observations)
+
+    def yearly(self, start=START_YEAR, end=END_YEAR):
+        """
+        Long (Location, Measure, Year, Value) table of yearly means for start..end,
+        gap-filled for every location and measure in one groupby. Cached per range.
+        """
+        key = (start, end)
+        if key not in self._yearly:
+            in_range = self.observations[self.observations['Year'].between(start, end)]
+            means = in_range.groupby(['Location', 'Measure', 'Year'], observed=True)['Value'].mean()
+            # Every series that has observations in any year, even if none fall in start..end
+            series = self.observations[['Location', 'Measure']].drop_duplicates()
+            wide = means.unstack('Year').reindex(
+                pd.MultiIndex.from_frame(series).sort_values(), columns=range(start, end + 1)
+            )
+            filled = fill_years(wide)
+            yearly = filled.reset_index().melt(id_vars=['Location', 'Measure'], var_name='Year', value_name='Value')
+            yearly = yearly.sort_values(['Location', 'Measure', 'Year'], kind='stable', ignore_index=True)
+            yearly['Year'] = yearly['Year'].astype(np.int16)
+            yearly['Location'] = yearly['Location'].astype(self.observations['Location'].dtype)
+            yearly['Measure'] = yearly['Measure'].astype(self.observations['Measure'].dtype)
+            self._yearly[key] = yearly
+        return self._yearly[key]
+
+    def wide(self, start=START_YEAR, end=END_YEAR):
+        """One row per location and year, one column per measure - the regression/correlation view"""
+        return self.yearly(start, end).pivot_table(
+            index=['Location', 'Year'], columns='Measure', values='Value', observed=True, dropna=False
+        )
+
+    def save(self, path, start=START_YEAR, end=END_YEAR):
+        """Observations and the yearly table as typed columns in a single .npz file"""
+        yearly = self.yearly(start, end)
+        columns = {}
+        for prefix, table in (('obs', self.observations), ('yearly', yearly)):
+            for name in ('Location', 'Measure'):
+                codes, categories = categorical_arrays(table[name])
+                columns[f'{prefix}_{name}_codes'] = codes
+                columns[f'{prefix}_{name}_categories'] = categories
+            columns[f'{prefix}_Year'] = table['Year'].to_numpy(dtype=np.int16)
+            columns[f'{prefix}_Value'] = table['Value'].to_numpy(dtype=np.float64)
+        columns['obs_Date'] = self.observations['Date'].to_numpy(dtype='datetime64[ns]')
+        columns['yearly_range'] = np.array([start, end])
+        np.savez(path, **columns)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            tables = {}
+            for prefix in ('obs', 'yearly'):
+                tables[prefix] = pd.DataFrame({
+                    name: from_categorical_arrays(data[f'{prefix}_{name}_codes'], data[f'{prefix}_{name}_categories'])
+                    for name in ('Location', 'Measure')
+                })
+                tables[prefix]['Year'] = data[f'{prefix}_Year']
+                tables[prefix]['Value'] = data[f'{prefix}_Value']
+            tables['obs'].insert(2, 'Date', data['obs_Date'])
+            start, end = data['yearly_range'].tolist()
+        store = cls(tables['obs'])
+        store._yearly[(start, end)] = tables['yearly']
+        return store
+
+def main(config=DEFAULT_CONFIG):
+    base_dir = os.path.dirname(os.path.realpath(__file__))
+    store = MeasureStore.from_catalog(FileCatalog.load(base_dir), config.regions)
+    output_path = os.path.join(base_dir, STORE_NAME)
+    store.save(output_path, config.start_year, config.end_year)
+
+    observations = store.observations
+    print(f"Read {len(observations)} observations of {observations['Measure'].nunique()} measures "
+          f"in {observations['Location'].nunique()} locations")
+    wide = store.wide(config.start_year, config.end_year)
+    print(f"\nYearly {config.start_year}-{config.end_year} values available per measure:")
+    print(wide.notna().groupby(level='Location', observed=True).sum().to_string())
+    print(f"\nSaved measure store to {output_path}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the long-format store of every measure for every region")
+    add_config_arguments(parser)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    main(config=config_from_args(parse_args()))
@@ -0,0 +1,125 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from interpolation import interpolate_gaps
+
+class Panel:
+    """
+    Daily values for many locations as one contiguous float64 array (dates x locations)
+    with a shared DatetimeIndex. Columns are looked up by location name in O(1) and
+    trimming/interpolation work on the whole array at once.
+    """
+
+    def __init__(self, values, dates, locations):
+        self.values = values
+        self.dates = pd.DatetimeIndex(dates)
+        self.locations = list(locations)
+        self._positions = {location: i for i, location in enumerate(self.locations)}
+        if self.values.shape != (len(self.dates), len(self.locations)):
+            raise ValueError(f"Panel values have shape {self.values.shape}, expected "
+                             f"({len(self.dates)}, {len(self.locations)})")
+
+    @classmethod
+    def from_series(cls, series_by_location):
+        """
+        Build the panel in one pass from {location: Series indexed by date}.
+        The date index covers every day from the earliest to the latest observation;
+        days a location has no value for are NaN, and duplicate days are averaged.
+        """
+        locations = list(series_by_location)
+        if not locations:
+            raise ValueError("Cannot build a panel without any locations")
+        day_indexes = {
+            location: pd.DatetimeIndex(series.index).normalize().to_numpy(dtype='datetime64[D]')
+            for location, series in series_by_location.items()
+        }
+        start = min(days.min() for days in day_indexes.values())
+        end = max(days.max() for days in day_indexes.values())
+        dates = pd.date_range(start, end, freq='D')
+
+        values = np.full((len(dates), len(locations)), np.nan)
+        for column, location in enumerate(locations):
+            rows = (day_indexes[location] - start).astype(np.int64)
+            observed = series_by_location[location].to_numpy(dtype=np.float64)
+            valid = ~np.isnan(observed)
+            # Sum and count per day so duplicate days come out as their mean
+            sums = np.bincount(rows[valid], weights=observed[valid], minlength=len(dates))
+            counts = np.bincount(rows[valid], minlength=len(dates))
+            has_value = counts > 0
+            values[has_value, column] = sums[has_value] / counts[has_value]
+
+        return cls(values, dates, locations)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def __contains__(self, location):
+        return location in self._positions
+
+    def column(self, location):
+        """Values for one location as a view into the panel"""
+        return self.values[:, self._positions[location]]
+
+    def __getitem__(self, location):
+        return pd.Series(self.column(location), index=self.dates, name=location)
+
+    def valid_ranges(self):
+        """(first, last) row index with a value for every location, -1 where a column is empty"""
+        has_value = ~np.isnan(self.values)
+        any_value = has_value.any(axis=0)
+        first = np.where(any_value, has_value.argmax(axis=0), -1)
+        last = np.where(any_value, len(self.dates) - 1 - has_value[::-1].argmax(axis=0), -1)
+        return first, last
+
+    def common_range(self):
+        """First and last date that every location has data within"""
+        first, last = self.valid_ranges()
+        if (first < 0).any():
+            raise ValueError("Some locations have no values at all")
+        return self.dates[first.max()], self.dates[last.min()]
+
+    def slice_dates(self, start, end):
+        """Panel restricted to start..end (inclusive), sharing memory with this one"""
+        start_row = self.dates.searchsorted(start, side='left')
+        end_row = self.dates.searchsorted(end, side='right')
+        return Panel(self.values[start_row:end_row], self.dates[start_row:end_row], self.locations)
+
+    def trim_to_common_range(self):
+        return self.slice_dates(*self.common_range())
+
+    def interpolate(self, limit=None, copy=False):
+        """
+        Linearly interpolate interior gaps of at most limit days in every column at once.
+        Fills this panel's values in place unless copy=True.
+        Returns (panel, gap_histogram) - see interpolation.interpolate_gaps.
+        """
+        filled, histogram = interpolate_gaps(self.values, limit=limit, copy=copy)
+        return Panel(filled, self.dates, self.locations), histogram
+
+    def missing_counts(self):
+        """NaN count per location"""
+        return np.isnan(self.values).sum(axis=0)
+
+    def to_frame(self):
+        return pd.DataFrame(self.values, index=self.dates, columns=self.locations)
+
+    def save(self, directory):
+        """Save as .npy column files plus a JSON sidecar so the values can be memory-mapped"""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'values.npy'), np.ascontiguousarray(self.values))
+        np.save(os.path.join(directory, 'dates.npy'), self.dates.to_numpy(dtype='datetime64[ns]'))
+        with open(os.path.join(directory, 'locations.json'), 'w') as f:
+            json.dump(self.locations, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """Load a saved panel; by default the values are memory-mapped read-only"""
+        values = np.load(os.path.join(directory, 'values.npy'), mmap_mode=mmap_mode)
+        dates = np.load(os.path.join(directory, 'dates.npy'))
+        with open(os.path.join(directory, 'locations.json'), 'r') as f:
+            locations = json.load(f)
+        return cls(values, dates, locations)
@@ -1,115 +1,131 @@
+import argparse
+import contextlib
+import io
 import os
 import csv
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 
-def process_file(file_path):
+import instrumentation
+from csv_cache import DATA_COMMONS_COLUMNS, load_observations
+from file_catalog import FileCatalog, sniff_file
+from instrumentation import add_report_arguments, instrumented, record_error, record_rows, run_report
+from run_config import DEFAULT_CONFIG, add_config_arguments, config_from_args
+
+def read_observations(file_path, measure):
     """
-    Process a CSV file to extract yearly averages and ensure data from 2000-2023
+    Read one county data file as (Date, Year, Value) rows, whatever its layout
+    Date is the parsed observation date (NaT where only the year is known to pandas'
+    parser), Year its year. Returns None if the file has no recognisable date column.
     """
-    try:
-        # Determine what kind of file we're processing based on the filename
-        filename = os.path.basename(file_path)
-        value_column = None
-        if "AQI" in filename or "Air quality" in filename:
-            value_column = "AQI"
-            measure = "AQI"
-        elif "PM2.5" in filename:
-            value_column = "Value"
-            measure = "PM2.5"
-        elif "income" in filename:
-            value_column = "Value" 
-            measure = "Income"
-        elif "employed" in filename or "employment" in filename:
-            value_column = "Value"
-            measure = "Employment"
-        elif "Population" in filename:
-            value_column = "Value"
-            measure = "Population"
-        elif "temperature" in filename or "Temp" in filename:
-            value_column = "Value"
-            measure = "Temperature"
-        else:
-            value_column = "Value"
-            measure = "Value"
-        
-        # Extract county name from the path
-        county_name = str(Path(file_path).parent).split('/')[-1].replace(' Data', '')
-        
-        # Read the CSV file
-        print(f"Processing {file_path}...")
+    value_column = "AQI" if measure == "AQI" else "Value"
+    
+    # Data Commons exports come back from the binary cache with typed Date/Value columns
+    df = load_observations(file_path, layout=DATA_COMMONS_COLUMNS)
+    if df is not None:
+        value_column = "Value"
+    else:
         try:
             df = pd.read_csv(file_path)
         except pd.errors.ParserError:
             # Sometimes CSV files might need different parsing settings
             df = pd.read_csv(file_path, engine='python')
-            
-        # Handle different file formats
-        date_column = None
-        if "Date" in df.columns:
-            date_column = "Date"
-        elif "Year" in df.columns:
-            date_column = "Year"
-        else:
-            # If neither Date nor Year is found, look for a column that might contain dates
-            for col in df.columns:
-                if df[col].dtype == object:  # Check if column contains strings
-                    sample = str(df[col].iloc[0]) if not df.empty else ""
-                    if "-" in sample and len(sample) >= 8:  # Simple check for date-like strings
-                        date_column = col
-                        break
-            
-        if date_column is None:
-            print(f"Could not find date column in {file_path}")
-            return None
-            
-        # Extract year from the date column
-        if date_column == "Year":
-            df["Year"] = pd.to_numeric(df[date_column], errors='coerce')
-        else:
-            try:
-                # Try to parse dates - handle different date formats
-                df["Year"] = pd.to_datetime(df[date_column], errors='coerce').dt.year
-            except:
-                # If regular parsing fails, try to extract year from string
-                df["Year"] = df[date_column].str.extract(r'(\d{4})').astype(float)
-        
-        # Drop rows with invalid years
-        df = df.dropna(subset=["Year"])
         
-        # Find the appropriate value column if not already determined
-        if value_column not in df.columns:
-            numeric_columns = df.select_dtypes(include=[np.number]).columns
-            for col in numeric_columns:
-                if col != "Year" and col != date_column:
-                    value_column = col
+    # Handle different file formats
+    date_column = None
+    if "Date" in df.columns:
+        date_column = "Date"
+    elif "Year" in df.columns:
+        date_column = "Year"
+    else:
+        # If neither Date nor Year is found, look for a column that might contain dates
+        for col in df.columns:
+            if df[col].dtype == object:  # Check if column contains strings
+                sample = str(df[col].iloc[0]) if not df.empty else ""
+                if "-" in sample and len(sample) >= 8:  # Simple check for date-like strings
+                    date_column = col
                     break
         
-        if value_column not in df.columns:
-            # Try to find a column with numeric values
-            for col in df.columns:
-                if col != "Year" and col != date_column:
-                    try:
-                        df[col] = pd.to_numeric(df[col], errors='coerce')
-                        if not df[col].isna().all():
-                            value_column = col
-                            break
-                    except:
-                        continue
+    if date_column is None:
+        print(f"Could not find date column in {file_path}")
+        return None
         
-        if value_column is None:
-            print(f"Could not find value column in {file_path}")
+    # Extract year from the date column
+    if date_column == "Year":
+        df["Year"] = pd.to_numeric(df[date_column], errors='coerce')
+        dates = pd.to_datetime(df["Year"].astype('Int64').astype(str), format='%Y', errors='coerce')
+    else:
+        try:
+            # Try to parse dates - handle different date formats
+            dates = pd.to_datetime(df[date_column], errors='coerce')
+            df["Year"] = dates.dt.year
+        except:
+            # If regular parsing fails, try to extract year from string
+            df["Year"] = df[date_column].str.extract(r'(\d{4})').astype(float)
+            dates = pd.Series(pd.NaT, index=df.index)
+    
+    # Drop rows with invalid years
+    valid = df["Year"].notna()
+    df = df[valid]
+    
+    # Find the appropriate value column if not already determined
+    if value_column not in df.columns:
+        numeric_columns = df.select_dtypes(include=[np.number]).columns
+        for col in numeric_columns:
+            if col != "Year" and col != date_column:
+                value_column = col
+                break
+    
+    if value_column not in df.columns:
+        # Try to find a column with numeric values
+        for col in df.columns:
+            if col != "Year" and col != date_column:
+                try:
+                    df[col] = pd.to_numeric(df[col], errors='coerce')
+                    if not df[col].isna().all():
+                        value_column = col
+                        break
+                except:
+                    continue
+    
+    return pd.DataFrame({
+        "Date": dates[valid].to_numpy(),
+        "Year": df["Year"].to_numpy(),
+        "Value": df[value_column].to_numpy()
+    })
+
+@instrumented('process_file')
+def process_file(file_path, measure=None, config=DEFAULT_CONFIG):
+    """
+    Process a CSV file to extract yearly averages and ensure data for every year of the run's window
+    measure is what the file holds, as recorded in the file catalog; if not given
+    it is sniffed from the file's header and first row.
+    """
+    try:
+        # Determine what kind of file we're processing from its Variable DCID or columns
+        if measure is None:
+            measure = sniff_file(file_path)['measure']
+        value_column = "Value"
+        
+        # Extract county name from the path
+        county_name = str(Path(file_path).parent).split('/')[-1].replace(' Data', '')
+        
+        # Read the CSV file
+        print(f"Processing {file_path}...")
+        df = read_observations(file_path, measure)
+        if df is None:
             return None
-            
+        
         # Calculate the mean value for each year
         yearly_mean = df.groupby("Year")[value_column].mean().reset_index()
         
-        # Filter to include only years from 2000 to 2023
-        yearly_mean = yearly_mean[(yearly_mean["Year"] >= 2000) & (yearly_mean["Year"] <= 2023)]
+        # Filter to include only years in the window
+        yearly_mean = yearly_mean[(yearly_mean["Year"] >= config.start_year) & (yearly_mean["Year"] <= config.end_year)]
         
-        # Create a complete dataframe with all years from 2000 to 2023
-        all_years = pd.DataFrame({"Year": range(2000, 2024)})
+        # Create a complete dataframe with every year in the window
+        all_years = pd.DataFrame({"Year": config.years})
         result_df = pd.merge(all_years, yearly_mean, on="Year", how="left")
         
         # Check if we have gaps that need to be filled
@@ -136,67 +152,122 @@ def process_file(file_path):
         
         # Generate output filename
         output_dir = os.path.dirname(file_path)
-        output_filename = f"{measure.lower()}_yearly_2000_2023.csv"
+        output_filename = f"{measure.lower()}_yearly_{config.window}.csv"
         output_path = os.path.join(output_dir, output_filename)
         
         # Save the processed data
         output_df.to_csv(output_path, index=False)
+        record_rows(len(df), len(output_df))
         print(f"Saved processed data to {output_path}")
         
         return output_path
     except Exception as e:
         print(f"Error processing {file_path}: {str(e)}")
+        record_error(e)
         return None
 
-def process_county_directory(county_dir):
+def process_county_directory(county_dir, failures=None, catalog=None, config=DEFAULT_CONFIG):
     """
     Process all CSV files in a county directory
+    Files are processed in sorted order so outputs that several files write are deterministic.
+    Paths of files that could not be processed are appended to failures if given.
     """
+    if catalog is None:
+        catalog = FileCatalog.load(os.path.dirname(os.path.normpath(county_dir)))
+    
     processed_files = []
-    for root, _, files in os.walk(county_dir):
-        for file in files:
-            if file.endswith('.csv') and not file.endswith('_yearly_2000_2023.csv'):
-                file_path = os.path.join(root, file)
-                processed_file = process_file(file_path)
-                if processed_file:
-                    processed_files.append(processed_file)
+    for file_path, entry in catalog.files_in(county_dir):
+        # Skip files other scripts wrote, including this one's *_yearly_<window>.csv
+        if entry['stage'] != 'output':
+            processed_file = process_file(file_path, entry['measure'], config)
+            if processed_file:
+                processed_files.append(processed_file)
+            elif failures is not None:
+                failures.append(file_path)
     
     return processed_files
 
-def main():
+def run_county_directory(county_dir, instrument=False, catalog=None, config=DEFAULT_CONFIG):
+    """
+    Process one county directory with its output captured, so runs in worker
+    processes can be printed in order by the parent
+    Returns (processed_files, failures, log, records) where records are the
+    per-file measurements when instrument is set
+    """
+    failures = []
+    log = io.StringIO()
+    report = instrumentation.collect() if instrument else contextlib.nullcontext()
+    with report as collected, contextlib.redirect_stdout(log):
+        try:
+            processed_files = process_county_directory(county_dir, failures, catalog, config)
+        except Exception as e:
+            print(f"Error processing {county_dir}: {str(e)}")
+            processed_files = []
+            failures.append(county_dir)
+    records = collected.records if collected is not None else []
+    return processed_files, failures, log.getvalue(), records
+
+def main(workers=1, config=DEFAULT_CONFIG):
     # Base directory
     base_dir = os.path.dirname(os.path.realpath(__file__))
     
-    # Counties to process (starting with Frederick and remaining counties)
-    counties = [
-        "Fredrick County, MD Data",
-        "Howard County, MD Data",
-        "Loudoun County, VA Data",
-        "Montgomery County, MD Data",
-        "Prince George's County, MD Data",
-        "Prince William County, VA Data",
-        "Washington, DC Data"
-    ]
+    # Counties to process, from the run's regions
+    counties = [region.folder for region in config.regions]
     
-    # Process each county directory
-    for county in counties:
-        county_dir = os.path.join(base_dir, county)
-        if os.path.exists(county_dir):
+    # Each county directory is an independent unit of work
+    county_dirs = [os.path.join(base_dir, county) for county in counties]
+    found_dirs = [county_dir for county_dir in county_dirs if os.path.exists(county_dir)]
+    
+    # Index every county's files once instead of rescanning each directory
+    catalog = FileCatalog.load(base_dir)
+    
+    all_failures = []
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else contextlib.nullcontext()
+    with pool as executor:
+        # Results come back in submission order, so the log reads the same for any worker count
+        mapper = executor.map if executor is not None else map
+        # Measurements are taken where the files are processed and sent back with the results
+        report = instrumentation.active_report()
+        results = mapper(run_county_directory, found_dirs, [report is not None] * len(found_dirs),
+                         [catalog] * len(found_dirs), [config] * len(found_dirs))
+        
+        for county, county_dir in zip(counties, county_dirs):
+            if county_dir not in found_dirs:
+                print(f"County directory not found: {county_dir}")
+                continue
             print(f"\nProcessing {county}...")
-            processed_files = process_county_directory(county_dir)
+            processed_files, failures, log, records = next(results)
+            print(log, end='')
+            if report is not None:
+                report.extend(records)
             print(f"Processed {len(processed_files)} files in {county}")
-        else:
-            print(f"County directory not found: {county_dir}")
+            all_failures.extend(failures)
+    
+    # Summarize failures instead of leaving them scattered through the log
+    if all_failures:
+        print(f"\n{len(all_failures)} files could not be processed:")
+        for file_path in all_failures:
+            print(f"  {file_path}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Process county data files into yearly averages over the study window")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of worker processes (default: 1, run in this process)")
+    add_config_arguments(parser)
+    add_report_arguments(parser)
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    with run_report(args.report, args.profile):
+        main(workers=args.workers, config=config_from_args(args))
 
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import os
 
-def process_county_data(input_file, county_name, data_type):
+def process_county_data(input_file, county_name, data_type, config=DEFAULT_CONFIG):
     """
     Process county data files into standardized yearly format
     Args:
@@ -253,8 +324,8 @@ def process_county_data(input_file, county_name, data_type):
     # Calculate yearly averages
     yearly_avg = df.groupby('year')[value_col].mean().reset_index()
     
-    # Create full range of years from 2000 to 2023
-    full_range = pd.DataFrame({'year': range(2000, 2024)})
+    # Create full range of years in the window
+    full_range = pd.DataFrame({'year': config.years})
     
     # Merge with actual data
     merged = pd.merge(full_range, yearly_avg, on='year', how='left')
@@ -271,46 +342,40 @@ def process_county_data(input_file, county_name, data_type):
     
     return final_df
 
-def process_all_counties(base_dir="."):
-    """Process all data types for all counties"""
-    counties = [
-        ("FairFax County, VA Data", "Fairfax County, VA"),
-        ("Fredrick County, MD Data", "Frederick County, MD"),
-        ("Howard County, MD Data", "Howard County, MD"),
-        ("Montgomery County, MD Data", "Montgomery County, MD"),
-        ("Prince George's County, MD Data", "Prince George's County, MD"),
-        ("Loudoun County, VA Data", "Loudoun County, VA"),
-        ("Prince William County, VA Data", "Prince William County, VA"),
-        ("Arlington County, VA Data", "Arlington County, VA"),
-        ("Alexandria City, VA Data", "Alexandria City, VA")
-    ]
+def process_all_counties(base_dir=".", config=DEFAULT_CONFIG):
+    """Process all data types for the run's counties"""
+    counties = [(region.folder, region.label) for region in config.regions]
     
     data_types = ['temperature', 'aqi', 'income', 'population', 'employment']
+    # Catalog measure holding each data type
+    measures = {
+        'temperature': 'Temperature',
+        'aqi': 'AQI',
+        'income': 'Income',
+        'population': 'Population',
+        'employment': 'Employment'
+    }
+    catalog = FileCatalog.load(base_dir)
     
     for county_folder, county_name in counties:
         print(f"\nProcessing {county_name}...")
         
         for data_type in data_types:
             try:
-                # Find relevant input file
-                input_files = []
-                for file in os.listdir(os.path.join(base_dir, county_folder)):
-                    if any(keyword in file.lower() for keyword in [data_type, 'temp', 'aqi', 'household', 'employ']):
-                        input_files.append(os.path.join(base_dir, county_folder, file))
+                # Look up the raw file holding this data type
+                input_file = catalog.find(county_folder, measures[data_type])
                 
-                if not input_files:
+                if input_file is None:
                     print(f"No {data_type} file found for {county_name}")
                     continue
                 
-                # Process first matching file
-                input_file = input_files[0]
-                df = process_county_data(input_file, county_name, data_type)
+                df = process_county_data(input_file, county_name, data_type, config)
                 
                 # Save processed data
                 output_file = os.path.join(
                     base_dir,
                     county_folder, 
-                    f"{county_name.split(',')[0].lower().replace(' ', '_')}_{data_type}_2000_2023.csv"
+                    f"{county_name.split(',')[0].lower().replace(' ', '_')}_{data_type}_{config.window}.csv"
                 )
                 df.to_csv(output_file, index=False)
                 print(f"Processed {data_type} data for {county_name}")
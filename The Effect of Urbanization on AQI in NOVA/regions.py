@@ -0,0 +1,82 @@
+from collections import namedtuple
+
+class Region(namedtuple('Region', ['key', 'name', 'state', 'fips', 'folder', 'coords'])):
+    """One county or county-equivalent; key is the short name shown on the map"""
+    __slots__ = ()
+
+    @property
+    def label(self):
+        """How outputs name the region, e.g. 'Howard County, MD'"""
+        return f"{self.name}, {self.state}"
+
+    @property
+    def dcid(self):
+        return f"geoId/{self.fips}"
+
+# Every region in the study. Coordinates are simplified [lon, lat] boundary rings.
+REGIONS = [
+    Region('Fairfax', 'Fairfax County', 'VA', '51059', 'FairFax County, VA Data', [
+        [-77.31, 38.71], [-77.31, 38.98], [-77.12, 38.98],
+        [-77.12, 38.84], [-77.04, 38.84], [-77.04, 38.71],
+        [-77.31, 38.71]
+    ]),
+    Region('Frederick', 'Frederick County', 'MD', '24021', 'Fredrick County, MD Data', [
+        [-77.69, 39.21], [-77.69, 39.72], [-77.16, 39.72],
+        [-77.16, 39.21], [-77.69, 39.21]
+    ]),
+    Region('Howard', 'Howard County', 'MD', '24027', 'Howard County, MD Data', [
+        [-77.01, 39.13], [-77.01, 39.34], [-76.71, 39.34],
+        [-76.71, 39.13], [-77.01, 39.13]
+    ]),
+    Region('Montgomery', 'Montgomery County', 'MD', '24031', 'Montgomery County, MD Data', [
+        [-77.33, 38.93], [-77.33, 39.28], [-76.97, 39.28],
+        [-76.97, 38.93], [-77.33, 38.93]
+    ]),
+    Region('Prince Georges', "Prince George's County", 'MD', '24033', "Prince George's County, MD Data", [
+        [-76.97, 38.7], [-76.97, 39.1], [-76.71, 39.1],
+        [-76.71, 38.7], [-76.97, 38.7]
+    ]),
+    Region('Loudoun', 'Loudoun County', 'VA', '51107', 'Loudoun County, VA Data', [
+        [-77.95, 38.83], [-77.95, 39.33], [-77.31, 39.33],
+        [-77.31, 38.83], [-77.95, 38.83]
+    ]),
+    Region('Prince William', 'Prince William County', 'VA', '51153', 'Prince William County, VA Data', [
+        [-77.65, 38.53], [-77.65, 38.88], [-77.31, 38.88],
+        [-77.31, 38.53], [-77.65, 38.53]
+    ]),
+    Region('Arlington', 'Arlington County', 'VA', '51013', 'Arlington County, VA Data', [
+        [-77.17, 38.83], [-77.17, 38.93], [-77.04, 38.93],
+        [-77.04, 38.83], [-77.17, 38.83]
+    ]),
+    Region('Alexandria', 'Alexandria City', 'VA', '51510', 'Alexandria City, VA Data', [
+        [-77.14, 38.77], [-77.14, 38.86], [-77.04, 38.86],
+        [-77.04, 38.77], [-77.14, 38.77]
+    ]),
+    Region('District of Columbia', 'Washington', 'DC', '11001', 'Washington, DC Data', [
+        [-77.12, 38.79], [-77.12, 38.995], [-76.909, 38.995],
+        [-76.909, 38.79], [-77.12, 38.79]
+    ])
+]
+
+def _lookup_keys(region):
+    return {region.key, region.name, region.label, region.folder, region.fips, region.dcid}
+
+# Any of a region's names, its folder, FIPS code or DCID -> region, case-insensitive
+REGIONS_BY_NAME = {key.lower(): region for region in REGIONS for key in _lookup_keys(region)}
+
+def get_region(name):
+    try:
+        return REGIONS_BY_NAME[name.lower()]
+    except KeyError:
+        raise KeyError(f"Unknown region {name!r}") from None
+
+def select_regions(names=None, states=None):
+    """Regions matching any of names (if given) and in one of states (if given), in registry order"""
+    selected = REGIONS
+    if names:
+        wanted = {get_region(name).key for name in names}
+        selected = [region for region in selected if region.key in wanted]
+    if states:
+        states = {state.upper() for state in states}
+        selected = [region for region in selected if region.state in states]
+    return selected
@@ -0,0 +1,39 @@
+from collections import namedtuple
+
+from regions import REGIONS, select_regions
+
+# Default study window, inclusive
+START_YEAR = 2000
+END_YEAR = 2023
+
+class RunConfig(namedtuple('RunConfig', ['regions', 'start_year', 'end_year'])):
+    """Which regions and years a run covers"""
+    __slots__ = ()
+
+    @property
+    def years(self):
+        return range(self.start_year, self.end_year + 1)
+
+    @property
+    def window(self):
+        """'2000_2023' style suffix for output file names"""
+        return f"{self.start_year}_{self.end_year}"
+
+    def includes(self, folder):
+        return any(region.folder == folder for region in self.regions)
+
+DEFAULT_CONFIG = RunConfig(REGIONS, START_YEAR, END_YEAR)
+
+def add_config_arguments(parser):
+    parser.add_argument('--regions', nargs='+', metavar='NAME',
+                        help="only these regions (short name, full name, folder or FIPS code)")
+    parser.add_argument('--states', nargs='+', metavar='ST', help="only regions in these states")
+    parser.add_argument('--start-year', type=int, default=START_YEAR,
+                        help=f"first year of the study window (default: {START_YEAR})")
+    parser.add_argument('--end-year', type=int, default=END_YEAR,
+                        help=f"last year of the study window (default: {END_YEAR})")
+
+def config_from_args(args):
+    if args.start_year > args.end_year:
+        raise ValueError(f"--start-year {args.start_year} is after --end-year {args.end_year}")
+    return RunConfig(select_regions(args.regions, args.states), args.start_year, args.end_year)
@@ -0,0 +1,100 @@
+import csv
+import os
+
+import numpy as np
+import pandas as pd
+
+# Column order of a Data Commons observation export
+DATA_COMMONS_HEADER = [
+    "Entity DCID",
+    "Entity properties isoCode",
+    "Entity properties name",
+    "Variable DCID",
+    "Variable observation date",
+    "Variable observation metadata importName",
+    "Variable observation metadata provenanceUrl",
+    "Variable observation metadata scalingFactor",
+    "Variable observation metadata unit",
+    "Variable observation metadata unitDisplayName",
+    "Variable observation value",
+    "Variable properties name"
+]
+
+# (variable DCID, import name, provenance URL, unit, unit display name, variable name) per measure
+VARIABLES = {
+    'aqi': ("AirQualityIndex_AirPollutant", "EPAAirQualityIndex",
+            "https://aqs.epa.gov/aqsweb/airdata/download_files.html", "", "", "Air Quality Index"),
+    'population': ("Count_Person", "USCensusPEP_Annual_Population",
+                   "https://www2.census.gov/programs-surveys/popest/tables", "", "", "Total Population"),
+    'temperature': ("DifferenceRelativeToBaseDate2006_Max_Temperature_RCP26", "NASA_NEXDCP30_AggrDiffStats",
+                    "https://www.nccs.nasa.gov/services/data-collections/land-based-products/nex-dcp30",
+                    "Celsius", "C", "Difference in Maximum Temperature Relative to the Base Date 2006 for RCP 2.6 Scenario")
+}
+
+def synthetic_daily_aqi(n_years, start_year=2000, missing_fraction=0.05, rng=None):
+    """Daily AQI with a summer peak, noise and randomly dropped days. Returns (dates, values)"""
+    rng = rng if rng is not None else np.random.default_rng(0)
+    dates = pd.date_range(f'{start_year}-01-01', f'{start_year + n_years - 1}-12-31', freq='D')
+    seasonal = 45 + 15 * np.sin(2 * np.pi * (dates.dayofyear.to_numpy() - 100) / 365.25)
+    trend = -0.5 * (dates.year.to_numpy() - start_year)
+    values = np.clip(np.round(seasonal + trend + rng.normal(0, 10, len(dates))), 0, 500).astype(int)
+    keep = rng.random(len(dates)) >= missing_fraction
+    return dates[keep], values[keep]
+
+def write_data_commons_csv(path, entity_dcid, entity_name, measure, dates_text, values):
+    """Write observations in the 12-column Data Commons export layout, quoted the same way"""
+    variable_dcid, import_name, provenance_url, unit, unit_display, variable_name = VARIABLES[measure]
+    n_rows = len(values)
+    df = pd.DataFrame({
+        "Entity DCID": [entity_dcid] * n_rows,
+        "Entity properties isoCode": [""] * n_rows,
+        "Entity properties name": [entity_name] * n_rows,
+        "Variable DCID": [variable_dcid] * n_rows,
+        "Variable observation date": list(dates_text),
+        "Variable observation metadata importName": [import_name] * n_rows,
+        "Variable observation metadata provenanceUrl": [provenance_url] * n_rows,
+        "Variable observation metadata scalingFactor": [""] * n_rows,
+        "Variable observation metadata unit": [unit] * n_rows,
+        "Variable observation metadata unitDisplayName": [unit_display] * n_rows,
+        "Variable observation value": values,
+        "Variable properties name": [variable_name] * n_rows
+    }, columns=DATA_COMMONS_HEADER)
+    df.to_csv(path, index=False, quoting=csv.QUOTE_NONNUMERIC)
+
+def write_synthetic_tree(base_dir, n_locations, n_years, start_year=2000, seed=0):
+    """
+    Create one "<name> Data" folder per location under base_dir, shaped like the real
+    county folders: a daily AQI export, a yearly population export and a monthly RCP 2.6
+    temperature projection. Returns the list of folder paths.
+    """
+    rng = np.random.default_rng(seed)
+    end_year = start_year + n_years - 1
+    folders = []
+    for i in range(n_locations):
+        name = f"Synthetic County {i:04d}"
+        entity_dcid = f"geoId/99{i:03d}"
+        folder = os.path.join(base_dir, f"{name}, XX Data")
+        os.makedirs(folder, exist_ok=True)
+
+        dates, aqi = synthetic_daily_aqi(n_years, start_year, rng=rng)
+        write_data_commons_csv(
+            os.path.join(folder, f"Air quality index in {name}.csv"),
+            entity_dcid, name, 'aqi', dates.strftime('%Y-%m-%d'), aqi
+        )
+
+        years = np.arange(start_year, end_year + 1)
+        population = np.round(100000 * (1 + rng.uniform(0, 0.03)) ** (years - start_year)).astype(int)
+        write_data_commons_csv(
+            os.path.join(folder, f"Population in {name}.csv"),
+            entity_dcid, name, 'population', years.astype(str), population
+        )
+
+        months = pd.period_range(f'{start_year}-01', f'{end_year}-12', freq='M')
+        temperature = np.round(0.02 * np.arange(len(months)) / 12 + rng.normal(0, 1, len(months)), 6)
+        write_data_commons_csv(
+            os.path.join(folder, f"Projected max temperature change under RCP 2.6 (based on year 2006) in {name}.csv"),
+            entity_dcid, name, 'temperature', months.strftime('%Y-%m'), temperature
+        )
+
+        folders.append(folder)
+    return folders
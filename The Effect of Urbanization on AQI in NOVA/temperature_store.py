@@ -0,0 +1,194 @@
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from csv_cache import DATA_COMMONS_COLUMNS, load_observations
+from date_parsing import detect_date_format, normalize_dates
+from file_catalog import FileCatalog
+from panel import Panel
+
+STORE_DIR = 'temperature_store'
+FREQUENCIES = ('month', 'season', 'year')
+
+# Seasons are meteorological (DJF, MAM, JJA, SON) and keyed by their first month, so
+# December belongs to the next year's winter: Dec 2000 - Feb 2001 is keyed 2000-12-01.
+
+def scenario_for(variable_dcid, filename):
+    """RCP scenario label like 'RCP26' from the Variable DCID, or 'RCP 2.6' in the file name"""
+    match = re.search(r'RCP(\d)(\d)$', variable_dcid or '')
+    if match is None:
+        match = re.search(r'RCP\s*(\d)\.(\d)', filename)
+    return f"RCP{match.group(1)}{match.group(2)}" if match else None
+
+def month_numbers(dates):
+    """Months since year 0 for each date, so consecutive months differ by one"""
+    dates = pd.DatetimeIndex(dates)
+    return dates.year.to_numpy() * 12 + dates.month.to_numpy() - 1
+
+def period_starts(dates, freq):
+    """First month of the month/season/year each date falls in, as month numbers"""
+    months = month_numbers(dates)
+    month_of_year = months % 12 + 1
+    if freq == 'month':
+        return months
+    if freq == 'season':
+        return months - month_of_year % 3
+    if freq == 'year':
+        return months - (month_of_year - 1)
+    raise ValueError(f"Unknown frequency {freq!r}, expected one of {FREQUENCIES}")
+
+def month_starts(month_numbers):
+    return pd.to_datetime({'year': month_numbers // 12, 'month': month_numbers % 12 + 1, 'day': 1})
+
+def read_monthly_series(file_path, entry):
+    """Monthly values of one temperature file as a Series indexed by date, read once"""
+    if entry['layout'] in ('data_commons', 'data_commons_simple'):
+        observations = load_observations(file_path, layout=DATA_COMMONS_COLUMNS)
+        if observations is not None:
+            return pd.Series(observations['Value'].to_numpy(), index=observations['Date'])
+    # Plain tables keep the date in the second column and the value in the last
+    date_column, value_column = entry['columns'][1], entry['columns'][-1]
+    df = pd.read_csv(file_path, usecols=[date_column, value_column], dtype={date_column: str},
+                     skipinitialspace=True)
+    dates, _, _ = normalize_dates(df[date_column])
+    return pd.Series(pd.to_numeric(df[value_column], errors='coerce').to_numpy(), index=dates)
+
+def monthly_panel(series_by_location):
+    """
+    Months x locations panel covering every month from the earliest to the latest
+    observation. Months without a value are NaN and duplicate months are averaged.
+    """
+    locations = list(series_by_location)
+    if not locations:
+        raise ValueError("Cannot build a panel without any locations")
+    # Only observations with both a date and a value count
+    observed = {}
+    for location, series in series_by_location.items():
+        dates = pd.DatetimeIndex(series.index)
+        values = series.to_numpy(dtype=np.float64)
+        valid = dates.notna() & ~np.isnan(values)
+        observed[location] = (month_numbers(dates[valid]), values[valid])
+    start = min(months.min() for months, _ in observed.values())
+    end = max(months.max() for months, _ in observed.values())
+    n_months = end - start + 1
+
+    values = np.full((n_months, len(locations)), np.nan)
+    for column, location in enumerate(locations):
+        months, observed_values = observed[location]
+        rows = months - start
+        sums = np.bincount(rows, weights=observed_values, minlength=n_months)
+        counts = np.bincount(rows, minlength=n_months)
+        has_value = counts > 0
+        values[has_value, column] = sums[has_value] / counts[has_value]
+
+    return Panel(values, month_starts(np.arange(start, end + 1)), locations)
+
+def resample_panel(panel, freq):
+    """Mean of each location over every month, season or year. Periods are keyed by their first day"""
+    starts = period_starts(panel.dates, freq)
+    # Months are sorted, so every period is one contiguous block of rows
+    boundaries = np.flatnonzero(np.diff(starts, prepend=starts[0] - 1))
+    has_value = ~np.isnan(panel.values)
+    sums = np.add.reduceat(np.where(has_value, panel.values, 0.0), boundaries, axis=0)
+    counts = np.add.reduceat(has_value.astype(np.int64), boundaries, axis=0)
+    with np.errstate(invalid='ignore'):
+        means = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    return Panel(means, month_starts(starts[boundaries]), panel.locations)
+
+class TemperatureStore:
+    """
+    Native monthly temperature projections for every location, one months x locations
+    panel per RCP scenario. Month, season and year means are computed on first use
+    and cached.
+    """
+
+    def __init__(self, panels):
+        self.panels = dict(panels)
+        self._resampled = {}
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        """Every monthly Data Commons temperature file in the catalog, grouped by scenario"""
+        series = {}
+        for relpath, entry in sorted(catalog.entries.items()):
+            if entry['measure'] != 'Temperature' or entry['stage'] != 'raw':
+                continue
+            scenario = scenario_for(entry['variable_dcid'], os.path.basename(relpath))
+            if scenario is None or detect_date_format([entry['first_date']], formats=['%Y-%m']) is None:
+                continue
+            file_path = os.path.join(catalog.base_dir, relpath)
+            series.setdefault(scenario, {})[entry['location']] = read_monthly_series(file_path, entry)
+        return cls({scenario: monthly_panel(by_location) for scenario, by_location in series.items()})
+
+    @property
+    def scenarios(self):
+        return sorted(self.panels)
+
+    def locations(self, scenario):
+        return self.panels[scenario].locations
+
+    def resample(self, scenario, freq='month'):
+        """Panel of period means for one scenario, cached after the first call"""
+        key = (scenario, freq)
+        if key not in self._resampled:
+            if freq == 'month':
+                self._resampled[key] = self.panels[scenario]
+            else:
+                self._resampled[key] = resample_panel(self.panels[scenario], freq)
+        return self._resampled[key]
+
+    def series(self, location, scenario, freq='month'):
+        return self.resample(scenario, freq)[location]
+
+    def scenario_frame(self, location, freq='month'):
+        """One location's values with a column per scenario, side by side"""
+        return pd.DataFrame({
+            scenario: self.series(location, scenario, freq)
+            for scenario in self.scenarios if location in self.panels[scenario]
+        })
+
+    def values_at(self, dates, location, scenario, freq='season'):
+        """
+        Value of the month/season/year each date falls in, e.g. to put the seasonal
+        temperature next to daily AQI. Dates outside the projection are NaN.
+        """
+        resampled = self.resample(scenario, freq)
+        starts = month_starts(period_starts(dates, freq))
+        rows = resampled.dates.get_indexer(starts)
+        column = resampled.column(location)
+        return np.where(rows >= 0, column[rows], np.nan)
+
+    def save(self, directory):
+        """One saved panel per scenario, so the monthly values can be memory-mapped"""
+        os.makedirs(directory, exist_ok=True)
+        for scenario, panel in self.panels.items():
+            panel.save(os.path.join(directory, scenario))
+        with open(os.path.join(directory, 'scenarios.json'), 'w') as f:
+            json.dump(self.scenarios, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        with open(os.path.join(directory, 'scenarios.json'), 'r') as f:
+            scenarios = json.load(f)
+        return cls({scenario: Panel.load(os.path.join(directory, scenario), mmap_mode) for scenario in scenarios})
+
+def main():
+    base_dir = os.path.dirname(os.path.realpath(__file__))
+    store = TemperatureStore.from_catalog(FileCatalog.load(base_dir))
+    store.save(os.path.join(base_dir, STORE_DIR))
+
+    for scenario in store.scenarios:
+        monthly = store.resample(scenario, 'month')
+        seasonal = store.resample(scenario, 'season')
+        print(f"\n{scenario}: {len(monthly.locations)} locations, "
+              f"{monthly.dates[0]:%Y-%m} to {monthly.dates[-1]:%Y-%m}")
+        for location in monthly.locations:
+            summer = seasonal[location][seasonal.dates.month == 6]
+            print(f"  {location}: mean JJA change {summer.mean():.2f} over {summer.notna().sum()} summers")
+    print(f"\nTemperature store saved to {os.path.join(base_dir, STORE_DIR)}")
+
+if __name__ == "__main__":
+    main()
@@ -5,81 +5,11 @@ from shapely.geometry import Polygon, mapping
 import geopandas as gpd
 from shapely.geometry import shape
 
-def create_county_map():
-    # Define counties with their more accurate boundary coordinates
-    counties = {
-        'Fairfax': {
-            'state': 'VA',
-            'coords': [
-                [-77.31, 38.71], [-77.31, 38.98], [-77.12, 38.98],
-                [-77.12, 38.84], [-77.04, 38.84], [-77.04, 38.71],
-                [-77.31, 38.71]
-            ]
-        },
-        'Frederick': {
-            'state': 'MD',
-            'coords': [
-                [-77.69, 39.21], [-77.69, 39.72], [-77.16, 39.72],
-                [-77.16, 39.21], [-77.69, 39.21]
-            ]
-        },
-        'Howard': {
-            'state': 'MD',
-            'coords': [
-                [-77.01, 39.13], [-77.01, 39.34], [-76.71, 39.34],
-                [-76.71, 39.13], [-77.01, 39.13]
-            ]
-        },
-        'Montgomery': {
-            'state': 'MD',
-            'coords': [
-                [-77.33, 38.93], [-77.33, 39.28], [-76.97, 39.28],
-                [-76.97, 38.93], [-77.33, 38.93]
-            ]
-        },
-        'Prince Georges': {
-            'state': 'MD',
-            'coords': [
-                [-76.97, 38.7], [-76.97, 39.1], [-76.71, 39.1],
-                [-76.71, 38.7], [-76.97, 38.7]
-            ]
-        },
-        'Loudoun': {
-            'state': 'VA',
-            'coords': [
-                [-77.95, 38.83], [-77.95, 39.33], [-77.31, 39.33],
-                [-77.31, 38.83], [-77.95, 38.83]
-            ]
-        },
-        'Prince William': {
-            'state': 'VA',
-            'coords': [
-                [-77.65, 38.53], [-77.65, 38.88], [-77.31, 38.88],
-                [-77.31, 38.53], [-77.65, 38.53]
-            ]
-        },
-        'Arlington': {
-            'state': 'VA',
-            'coords': [
-                [-77.17, 38.83], [-77.17, 38.93], [-77.04, 38.93],
-                [-77.04, 38.83], [-77.17, 38.83]
-            ]
-        },
-        'Alexandria': {
-            'state': 'VA',
-            'coords': [
-                [-77.14, 38.77], [-77.14, 38.86], [-77.04, 38.86],
-                [-77.04, 38.77], [-77.14, 38.77]
-            ]
-        },
-        'District of Columbia': {
-            'state': 'DC',
-            'coords': [
-                [-77.12, 38.79], [-77.12, 38.995], [-76.909, 38.995],
-                [-76.909, 38.79], [-77.12, 38.79]
-            ]
-        }
-    }
+from regions import REGIONS
+
+def create_county_map(regions=REGIONS):
+    # County boundaries come from the shared region registry
+    counties = {region.key: {'state': region.state, 'coords': region.coords} for region in regions}
 
     # Create GeoJSON features
     features = []
@@ -2,16 +2,21 @@ import pandas as pd
 import os
 from pathlib import Path
 
+from instrumentation import instrumented, record_rows
+from run_config import START_YEAR
+
+@instrumented('aggregate_to_yearly')
 def aggregate_to_yearly(file_path):
     """Convert daily AQI data to yearly averages"""
     # Read the daily data
     df = pd.read_csv(file_path)
+    rows_in = len(df)
     
     # Convert Date to datetime
     df['Date'] = pd.to_datetime(df['Date'])
     
-    # Filter for years 2000 and later
-    df = df[df['Date'].dt.year >= 2000]
+    # Filter for years in the study window and later
+    df = df[df['Date'].dt.year >= START_YEAR]
     
     # Extract year from date
     df['Year'] = df['Date'].dt.year
@@ -36,9 +41,20 @@ def aggregate_to_yearly(file_path):
     
     # Save to CSV
     yearly_df.to_csv(output_path, index=False)
+    record_rows(rows_in, len(yearly_df))
     print(f"Saved yearly averages to {output_path}")
     return yearly_df
 
+def combine_yearly_data(yearly_data, output_path):
+    """Concatenate per-county yearly frames, sort by location and year, and save them"""
+    combined_df = pd.concat(yearly_data, ignore_index=True)
+    combined_df = combined_df.sort_values(['Location', 'Date'])
+    
+    # Save combined yearly data
+    combined_df.to_csv(output_path, index=False)
+    print(f"\nSaved combined yearly data to {output_path}")
+    return combined_df
+
 def process_all_counties():
     # Get the base directory
     base_dir = Path(__file__).parent
@@ -55,13 +71,7 @@ def process_all_counties():
     
     # Combine all yearly data into one file
     if yearly_data:
-        combined_df = pd.concat(yearly_data, ignore_index=True)
-        combined_df = combined_df.sort_values(['Location', 'Date'])
-        
-        # Save combined yearly data
-        output_path = base_dir / 'combined_yearly_aqi.csv'
-        combined_df.to_csv(output_path, index=False)
-        print(f"\nSaved combined yearly data to {output_path}")
+        combined_df = combine_yearly_data(yearly_data, base_dir / 'combined_yearly_aqi.csv')
         
         # Print summary statistics
         print("\nSummary of yearly data:")